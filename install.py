@@ -12,6 +12,9 @@ if not launch.is_installed("pydantic"):
 if not launch.is_installed("pillow"):
     launch.run_pip("install pillow", "requirements for photo message extension")
 
+if not launch.is_installed("python-multipart"):
+    launch.run_pip("install python-multipart", "requirements for photo message extension")
+
 if not launch.is_installed("python-socketio"):
     launch.run_pip("install python-socketio", "requirements for photo message extension")
 
@@ -1,43 +1,273 @@
 import os
-import sys
 import gradio as gr
 import json
 import base64
-import traceback
+import logging
+import logging.handlers
 from datetime import datetime
 from modules import script_callbacks, shared, api, scripts, img2img
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, Response
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from fastapi.concurrency import run_in_threadpool
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:
+    # python-multipart before 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
 from pydantic import BaseModel
 import io
-from PIL import Image
+from PIL import Image, ImageOps, UnidentifiedImageError
 import pandas as pd
-import numpy as np
 import requests
 import time
 import socketio
 import tempfile
+import mimetypes
+import sqlite3
+import threading
+import queue
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import uuid
+import random
+import hashlib
+import hmac
+import secrets
+import bisect
+import heapq
+import itertools
+import operator
+from collections import OrderedDict, deque
+
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+logger = logging.getLogger("photo_message")
+_log_listener = None
+
+def configure_logging():
+    """
+    Set up the extension's logger from the settings. PHOTO_MESSAGE_LOG_LEVEL
+    overrides the configured level. With async logging, records are handed to
+    a queue and written to stderr by a background thread.
+    """
+    global _log_listener
+    level = os.environ.get("PHOTO_MESSAGE_LOG_LEVEL") or getattr(shared.opts, "photo_message_log_level", "INFO")
+    use_queue = getattr(shared.opts, "photo_message_log_async", False)
+    
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("[Photo Message] %(levelname)s: %(message)s"))
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        _log_listener = logging.handlers.QueueListener(log_queue, handler)
+        _log_listener.start()
+        handler = logging.handlers.QueueHandler(log_queue)
+    logger.addHandler(handler)
+    logger.setLevel(str(level).upper() if str(level).upper() in LOG_LEVELS else "INFO")
+    logger.propagate = False
 
-print("\n[Photo Message] ====== Extension Loading ======")
-print(f"[Photo Message] Current directory: {os.path.dirname(os.path.abspath(__file__))}")
-print(f"[Photo Message] Python path: {sys.path}")
+configure_logging()
+logger.debug("Extension loading from %s", os.path.dirname(os.path.abspath(__file__)))
+
+# Display app that receives finished photos
+DISPLAY_APP_URL = 'http://localhost:5001'
 
 # Initialize SocketIO client
-sio = socketio.Client()
+# Reconnects are handled by DisplayAppConnection, not the client itself
+sio = socketio.Client(reconnection=False)
+
+# Formats of the new_photo message this extension can send, preferred first.
+# "binary" sends the images as raw bytes, which Socket.IO carries as binary
+# attachments instead of base64 text inside the JSON frame. It is only used
+# once the display app has announced support for it in reply to "hello".
+#
+# Display apps that answer "hello" also acknowledge every new_photo, which is
+# what confirms a delivery. Older display apps that never answer get their
+# photos over HTTP instead, where the response status is the confirmation.
+SOCKET_FORMATS = ["binary", "base64"]
+display_app_capabilities = {"binary": False, "acks": False}
+
+def set_display_app_capabilities(capabilities):
+    """Record the formats and acknowledgement support announced by the display app"""
+    if not isinstance(capabilities, dict):
+        reset_display_app_capabilities()
+        return
+    formats = capabilities.get("formats", [])
+    display_app_capabilities["binary"] = "binary" in formats
+    display_app_capabilities["acks"] = bool(capabilities.get("acks", True))
+    logger.info("Display app formats: %s, acks: %s", formats or ['base64'], display_app_capabilities['acks'])
+
+def reset_display_app_capabilities():
+    display_app_capabilities["binary"] = False
+    display_app_capabilities["acks"] = False
 
 @sio.event
 def connect():
-    print("[Photo Message] Connected to display app")
+    logger.info("Connected to display app")
+    reset_display_app_capabilities()
+
+@sio.on('capabilities')
+def on_capabilities(data):
+    set_display_app_capabilities(data)
 
 @sio.event
 def disconnect():
-    print("[Photo Message] Disconnected from display app")
+    logger.info("Disconnected from display app")
+    reset_display_app_capabilities()
+    display_app_connection.lost()
 
-# Try to connect to display app
-try:
-    sio.connect('http://localhost:5001')
-except Exception as e:
-    print(f"[Photo Message] Could not connect to display app: {e}")
+class DisplayAppConnection:
+    """
+    Keeps the Socket.IO connection to the display app up from a background
+    thread. Nothing waits on it: WebUI starts while the display app is down,
+    and failed connects are retried with exponential backoff plus jitter.
+    Listeners are told when the connection becomes ready (connected and
+    "hello" answered) and when it is lost.
+    """
+    HELLO_TIMEOUT = 5
+    
+    def __init__(self, client, url, connect_timeout=5, base_delay=1.0, max_delay=60.0):
+        self.client = client
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # stopped, connecting, connected or disconnected
+        self.state = "stopped"
+        self.failures = 0
+        self.last_error = None
+        self.connected_since = None
+        self.next_attempt_at = None
+        self.version = 0
+        self._ready_listeners = []
+        self._lost_listeners = []
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    @property
+    def ready(self):
+        return self.state == "connected" and self.client.connected
+    
+    def add_listeners(self, on_ready=None, on_lost=None):
+        if on_ready is not None:
+            self._ready_listeners.append(on_ready)
+        if on_lost is not None:
+            self._lost_listeners.append(on_lost)
+    
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="photo_message_display_app", daemon=True)
+            self._thread.start()
+    
+    def lost(self):
+        """Called when the socket disconnects, reconnect without waiting out a backoff"""
+        was_connected = self.state == "connected"
+        if was_connected:
+            self._set_state("disconnected", "Connection lost")
+        self._notify(self._lost_listeners)
+        if was_connected:
+            self._wake.set()
+    
+    def health(self):
+        with self._lock:
+            next_attempt_in = None
+            if self.state == "disconnected" and self.next_attempt_at is not None:
+                next_attempt_in = max(0.0, self.next_attempt_at - time.time())
+            return {
+                'url': self.url,
+                'state': self.state,
+                'connected': self.ready,
+                'binary': display_app_capabilities["binary"],
+                'acks': display_app_capabilities["acks"],
+                'failures': self.failures,
+                'last_error': self.last_error,
+                'connected_since': self.connected_since,
+                'next_attempt_in': next_attempt_in
+            }
+    
+    def describe(self):
+        """Status line for the UI"""
+        health = self.health()
+        if health['connected']:
+            return f"🟢 Display app connected ({self.url})"
+        if health['state'] == "connecting":
+            return f"🟡 Connecting to display app ({self.url})..."
+        if health['state'] == "stopped":
+            return "⚪ Display app connection not started"
+        return f"🔴 Display app unavailable ({health['last_error']}) - retrying, sends are held until it is back"
+    
+    def _set_state(self, state, error=None):
+        with self._lock:
+            self.state = state
+            if error is not None:
+                self.last_error = error
+            self.version += 1
+    
+    def _notify(self, listeners):
+        for listener in listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.exception("Error in display app connection listener: %s", e)
+    
+    def _run(self):
+        while True:
+            if self.ready:
+                # Sleep until lost() reports a disconnect
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            
+            self._wake.clear()
+            self._set_state("connecting")
+            try:
+                self._connect()
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                    delay = min(self.max_delay, self.base_delay * 2 ** (self.failures - 1))
+                    # Equal jitter, so restarts of many clients don't reconnect in lockstep
+                    delay = delay / 2 + random.uniform(0, delay / 2)
+                    self.next_attempt_at = time.time() + delay
+                if self.failures == 1:
+                    logger.warning("Could not connect to display app: %s", e)
+                self._set_state("disconnected", str(e) or type(e).__name__)
+                self._wake.wait(delay)
+                continue
+            
+            with self._lock:
+                self.failures = 0
+                self.next_attempt_at = None
+                self.connected_since = time.time()
+            self._set_state("connected")
+            logger.info("Display app connection ready (%s)", self.url)
+            self._notify(self._ready_listeners)
+    
+    def _connect(self):
+        if self.client.connected:
+            self.client.disconnect()
+        self.client.connect(self.url, wait_timeout=self.connect_timeout)
+        try:
+            capabilities = self.client.call(
+                'hello', {"client": "photo_message", "formats": SOCKET_FORMATS, "acks": True},
+                timeout=self.HELLO_TIMEOUT
+            )
+        except socketio.exceptions.TimeoutError:
+            # Older display apps don't know "hello"
+            capabilities = None
+        set_display_app_capabilities(capabilities)
+
+display_app_connection = DisplayAppConnection(sio, DISPLAY_APP_URL)
 
 # JavaScript code for handling tab switching and image sending
 js_code = """
@@ -208,64 +438,991 @@ function switch_to_extras() {
 }
 """
 
-# Store received photos
-photos = []
+
+def decode_image_data(image_data):
+    """Decode base64 image data (with or without a data URL prefix) to raw bytes"""
+    # Remove any existing prefix to ensure clean data
+    if 'base64,' in image_data:
+        image_data = image_data.split('base64,', 1)[1]
+    
+    # Add padding if needed
+    padding = len(image_data) % 4
+    if padding:
+        image_data += '=' * (4 - padding)
+    
+    return base64.b64decode(image_data)
+
+def parse_timestamp(timestamp):
+    """Seconds since the epoch for an ISO timestamp, or now if it can't be parsed"""
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+class LRUCache:
+    """Small thread-safe mapping that forgets its least recently used entries"""
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+    
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+    
+    def pop(self, key):
+        with self._lock:
+            return self._items.pop(key, None)
+
+# Decoded previews are kept for recently viewed photos only, so resident
+# memory does not grow with the number of photos received
+MAX_PREVIEW_IMAGES = 128
+PREVIEW_SIZE = 512
+_preview_images = LRUCache(MAX_PREVIEW_IMAGES)
 
 class PhotoMessage:
-    def __init__(self, image_data, name, message, timestamp, is_sent=False):
-        print(f"[Photo Message] Creating new PhotoMessage")
-        print(f"[Photo Message] Input image data type: {type(image_data)}")
+    """
+    A received photo. The payload is decoded once on arrival and kept as raw
+    image bytes together with its format and size until it is persisted to
+    the photo store; after that the bytes live on disk and are read back
+    on demand. The RGB preview is built the first time the list shows it and
+    is shared through a small LRU cache.
+    """
+    __slots__ = ('id', 'format', 'width', 'height', 'size', 'blob_path',
+                 'name', 'message', 'timestamp', 'is_sent', 'received_at',
+                 'last_access', '_bytes')
+    
+    def __init__(self, image_data, name, message, timestamp, is_sent=False, photo_id=None):
+        logger.debug("Creating new PhotoMessage")
+        logger.debug("Input image data type: %s", type(image_data))
+        
+        self.id = photo_id or uuid.uuid4().hex
+        self.format = None
+        self.width = 0
+        self.height = 0
+        self.size = 0
+        self.blob_path = None
+        self._bytes = None
         
         # Handle the image data
+        image_bytes = b''
         try:
             if isinstance(image_data, str):
-                print(f"[Photo Message] Image data length: {len(image_data)}")
-                print(f"[Photo Message] First 100 chars: {image_data[:100]}")
-                
-                # Remove any existing prefix to ensure clean data
-                if 'base64,' in image_data:
-                    print("[Photo Message] Removing data URL prefix")
-                    image_data = image_data.split('base64,')[1]
-                
-                # Add padding if needed
-                padding = len(image_data) % 4
-                if padding:
-                    print("[Photo Message] Adding base64 padding")
-                    image_data += '=' * (4 - padding)
-                
-                # Validate base64 data
-                try:
-                    print("[Photo Message] Validating base64 data")
-                    image_bytes = base64.b64decode(image_data)
-                    print(f"[Photo Message] Decoded bytes length: {len(image_bytes)}")
-                    
-                    # Try to create a PIL Image to validate
-                    test_image = Image.open(io.BytesIO(image_bytes))
-                    test_image.verify()
-                    print("[Photo Message] Successfully validated image data")
-                    
-                    # Store the validated base64 data
-                    self.image_data = image_data
-                except base64.binascii.Error as be:
-                    print(f"[Photo Message] Base64 decode error: {be}")
-                    print(f"[Photo Message] Base64 string preview: {image_data[:100]}...")
-                    self.image_data = None
-                except PIL.UnidentifiedImageError as pie:
-                    print(f"[Photo Message] PIL error: {pie}")
-                    print(f"[Photo Message] First few bytes: {image_bytes[:20].hex()}")
-                    self.image_data = None
+                logger.debug("Image data length: %s", len(image_data))
+                image_bytes = decode_image_data(image_data)
+            elif isinstance(image_data, (bytes, bytearray, memoryview)):
+                image_bytes = bytes(image_data)
             else:
-                print(f"[Photo Message] Unsupported image data type: {type(image_data)}")
-                self.image_data = None
+                raise TypeError(f"Unsupported image data type: {type(image_data)}")
+            logger.debug("Decoded bytes length: %s", len(image_bytes))
+            
+            # Validate the image and remember what it is
+            with Image.open(io.BytesIO(image_bytes)) as test_image:
+                image_format = test_image.format
+                width, height = test_image.size
+                test_image.verify()
+            logger.debug("Successfully validated %s image (%sx%s)", image_format, width, height)
+            
+            self._bytes = image_bytes
+            self.format = image_format
+            self.width = width
+            self.height = height
+            self.size = len(image_bytes)
+        except base64.binascii.Error as be:
+            logger.debug("Base64 decode error: %s", be)
+        except UnidentifiedImageError as pie:
+            logger.debug("PIL error: %s", pie)
+            logger.debug("First few bytes: %s", image_bytes[:20].hex())
         except Exception as e:
-            print(f"[Photo Message] Error processing image data: {e}")
-            print(traceback.format_exc())
-            self.image_data = None
+            logger.exception("Error processing image data: %s", e)
             
         self.name = name
         self.message = message
         self.timestamp = timestamp
         self.is_sent = is_sent
+        self.received_at = parse_timestamp(timestamp)
+        self.last_access = time.time()
+    
+    @classmethod
+    def from_record(cls, record, blob_path):
+        """Rebuild a photo from its photo store row without touching the image"""
+        photo = cls.__new__(cls)
+        photo.id = record['id']
+        photo.timestamp = record['timestamp']
+        photo.name = record['name']
+        photo.message = record['message']
+        photo.format = record['format']
+        photo.width = record['width']
+        photo.height = record['height']
+        photo.size = record['size']
+        photo.is_sent = bool(record['is_sent'])
+        photo.received_at = parse_timestamp(record['timestamp'])
+        photo.last_access = photo.received_at
+        photo.blob_path = blob_path
+        photo._bytes = None
+        return photo
+    
+    @classmethod
+    def from_file(cls, path, name, message, timestamp):
+        """
+        Build a photo from an upload that was streamed to disk. The file is
+        validated in place and later moved into the photo store as-is, so the
+        image bytes are never held in memory. Raises if it is not an image.
+        """
+        with Image.open(path) as test_image:
+            image_format = test_image.format
+            width, height = test_image.size
+            test_image.verify()
+        logger.debug("Successfully validated %s upload (%sx%s)", image_format, width, height)
+        
+        photo = cls.__new__(cls)
+        photo.id = uuid.uuid4().hex
+        photo.timestamp = timestamp
+        photo.name = name
+        photo.message = message
+        photo.format = image_format
+        photo.width = width
+        photo.height = height
+        photo.size = os.path.getsize(path)
+        photo.is_sent = False
+        photo.received_at = parse_timestamp(timestamp)
+        photo.last_access = time.time()
+        photo.blob_path = path
+        photo._bytes = None
+        return photo
+    
+    @property
+    def has_image(self):
+        return self._bytes is not None or self.blob_path is not None
+    
+    @property
+    def mime_type(self):
+        return Image.MIME.get(self.format, 'image/jpeg')
+    
+    @property
+    def image_bytes(self):
+        """Raw encoded image bytes, read from the photo store when persisted"""
+        if self._bytes is not None:
+            return self._bytes
+        if self.blob_path is None:
+            return None
+        with open(self.blob_path, 'rb') as f:
+            return f.read()
+    
+    def replace_image(self, image_bytes, image_format, size):
+        """Swap in a re-encoded rendition of a photo that has not been persisted yet"""
+        self._bytes = image_bytes
+        self.format = image_format
+        self.width, self.height = size
+        self.size = len(image_bytes)
+        self.blob_path = None
+    
+    def persisted(self, blob_path):
+        """Switch to reading the image from disk and drop the in-memory bytes"""
+        self.blob_path = blob_path
+        self._bytes = None
+    
+    @property
+    def preview(self):
+        """Small RGB rendition for the list preview, built once per photo"""
+        if not self.has_image:
+            return None
+        preview = _preview_images.get(self.id)
+        if preview is None:
+            # JPEGs are decoded at reduced size, other formats are decoded and scaled
+            preview = self._decode(draft_size=(PREVIEW_SIZE, PREVIEW_SIZE))
+            preview.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE), Image.LANCZOS)
+            _preview_images.put(self.id, preview)
+        return preview
+    
+    def _decode(self, draft_size=None):
+        source = io.BytesIO(self._bytes) if self._bytes is not None else self.blob_path
+        with Image.open(source) as opened:
+            if draft_size:
+                opened.draft('RGB', draft_size)
+            if opened.mode != 'RGB':
+                return opened.convert('RGB')
+            opened.load()
+            return opened.copy()
+    
+    def info(self):
+        """Metadata dict used by the UI to track the selected photo"""
+        return {
+            'id': self.id,
+            'timestamp': self.timestamp,
+            'name': self.name,
+            'message': self.message,
+            'is_sent': self.is_sent
+        }
+
+# Received photos are persisted under the extension directory so the queue
+# survives WebUI restarts
+EXTENSION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHOTO_STORE_DIR = os.path.join(EXTENSION_DIR, "photo_store")
+
+class PhotoStore:
+    """
+    On-disk photo queue: an SQLite index (WAL journal) holds the metadata and
+    sent state, while each image is written once to its own blob file. Blobs
+    are written atomically before their row is committed, so a crash can at
+    worst leave an orphaned blob which is cleaned up on the next load.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        self.staging_dir = os.path.join(root, "incoming")
+        self.originals_dir = os.path.join(root, "originals")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.staging_dir, exist_ok=True)
+        os.makedirs(self.originals_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # Bytes held by archived photos, counted against the size limit
+        self.archived_bytes = 0
+        self._db = sqlite3.connect(os.path.join(root, "photos.db"), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS photos (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT NOT NULL UNIQUE,
+                    timestamp TEXT NOT NULL,
+                    name TEXT,
+                    message TEXT,
+                    format TEXT,
+                    width INTEGER NOT NULL DEFAULT 0,
+                    height INTEGER NOT NULL DEFAULT 0,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    blob TEXT,
+                    is_sent INTEGER NOT NULL DEFAULT 0,
+                    archived INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            columns = {row['name'] for row in self._db.execute("PRAGMA table_info(photos)")}
+            if 'archived' not in columns:
+                self._db.execute("ALTER TABLE photos ADD COLUMN archived INTEGER NOT NULL DEFAULT 0")
+    
+    def blob_path(self, blob_name):
+        return os.path.join(self.blob_dir, blob_name)
+    
+    def _write_blob(self, blob_name, data):
+        path = self.blob_path(blob_name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return path
+    
+    def write_blob(self, photo):
+        """
+        Write a new photo's image to its blob file, the slow part of saving.
+        Returns the blob name to pass to insert, None if there is no image.
+        """
+        if not photo.has_image:
+            return None
+        blob_name = f"{photo.id}.{(photo.format or 'bin').lower()}"
+        if os.path.dirname(photo.blob_path or '') == self.blob_dir:
+            return os.path.basename(photo.blob_path)
+        if photo.blob_path is None:
+            self._write_blob(blob_name, photo.image_bytes)
+        else:
+            # Streamed upload, move the staged file into place
+            os.replace(photo.blob_path, self.blob_path(blob_name))
+        return blob_name
+    
+    def insert(self, photo, blob_name):
+        """Commit a photo's row once its blob is written, and move its bytes out of memory"""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO photos (id, timestamp, name, message, format, width, height, size, blob, is_sent) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (photo.id, photo.timestamp, photo.name, photo.message, photo.format,
+                 photo.width, photo.height, photo.size, blob_name, int(photo.is_sent))
+            )
+        if blob_name:
+            photo.persisted(self.blob_path(blob_name))
+    
+    def set_sent(self, photo_id, is_sent=True):
+        with self._lock, self._db:
+            self._db.execute("UPDATE photos SET is_sent = ? WHERE id = ?", (int(is_sent), photo_id))
+    
+    def archive(self, photos_to_archive):
+        """Take photos out of the live queue while keeping them on disk"""
+        with self._lock, self._db:
+            self._db.executemany("UPDATE photos SET archived = 1 WHERE id = ?", [(p.id,) for p in photos_to_archive])
+            self.archived_bytes += sum(p.size for p in photos_to_archive)
+    
+    def archived(self, offset=0, limit=20):
+        """One page of archived photos, newest first. Returns (photos, total)"""
+        with self._lock:
+            total = self._db.execute("SELECT COUNT(*) FROM photos WHERE archived = 1").fetchone()[0]
+            rows = self._db.execute("SELECT * FROM photos WHERE archived = 1 ORDER BY seq DESC LIMIT ? OFFSET ?",
+                                    (limit, offset)).fetchall()
+        return [PhotoMessage.from_record(row, self.blob_path(row['blob']) if row['blob'] else None)
+                for row in rows], total
+    
+    def restore(self, photo_id):
+        """Bring an archived photo back into the live queue, None if it is not archived"""
+        with self._lock, self._db:
+            row = self._db.execute("SELECT * FROM photos WHERE id = ? AND archived = 1", (photo_id,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE photos SET archived = 0 WHERE id = ?", (photo_id,))
+            self.archived_bytes -= row['size']
+        return PhotoMessage.from_record(row, self.blob_path(row['blob']) if row['blob'] else None)
+    
+    def prune_archive(self, max_bytes):
+        """Delete the oldest archived photos until the archive fits in max_bytes"""
+        if self.archived_bytes <= max_bytes:
+            return 0
+        pruned = []
+        excess = self.archived_bytes - max(0, max_bytes)
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM photos WHERE archived = 1 ORDER BY seq").fetchall()
+        for row in rows:
+            if excess <= 0:
+                break
+            pruned.append(PhotoMessage.from_record(row, self.blob_path(row['blob']) if row['blob'] else None))
+            excess -= row['size']
+        self.delete(pruned, archived=True)
+        return len(pruned)
+    
+    def save_original(self, photo_id, image_format, source):
+        """Keep the untouched upload next to the store; source is bytes or a staged file path"""
+        path = os.path.join(self.originals_dir, f"{photo_id}.{(image_format or 'bin').lower()}")
+        if isinstance(source, str):
+            os.replace(source, path)
+        else:
+            with open(path, 'wb') as f:
+                f.write(source)
+        return path
+    
+    def _original_paths(self, photo_id):
+        return [e.path for e in os.scandir(self.originals_dir)
+                if e.is_file() and e.name.split('.', 1)[0] == photo_id]
+    
+    def delete(self, photos_to_delete, archived=False):
+        """Remove photos, their blobs and any kept originals from the store"""
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM photos WHERE id = ?", [(p.id,) for p in photos_to_delete])
+            if archived:
+                self.archived_bytes -= sum(p.size for p in photos_to_delete)
+        for photo in photos_to_delete:
+            paths = self._original_paths(photo.id)
+            if photo.blob_path:
+                paths.append(photo.blob_path)
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning("Could not remove %s: %s", path, e)
+    
+    def load(self):
+        """Load all live photos in arrival order, repairing any crash leftovers"""
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM photos ORDER BY seq").fetchall()
+        
+        loaded = []
+        missing = []
+        referenced = set()
+        for row in rows:
+            path = None
+            if row['blob']:
+                path = self.blob_path(row['blob'])
+                if not os.path.exists(path):
+                    missing.append(row['id'])
+                    continue
+                referenced.add(row['blob'])
+            if row['archived']:
+                self.archived_bytes += row['size']
+            else:
+                loaded.append(PhotoMessage.from_record(row, path))
+        
+        if missing:
+            logger.warning("Dropping %s queued photos with missing image files", len(missing))
+            with self._lock, self._db:
+                self._db.executemany("DELETE FROM photos WHERE id = ?", [(i,) for i in missing])
+        
+        # Remove blobs whose row never got committed and interrupted uploads
+        known_ids = {row['id'] for row in rows}
+        leftovers = [e for e in os.scandir(self.blob_dir) if e.is_file() and e.name not in referenced]
+        leftovers.extend(e for e in os.scandir(self.staging_dir) if e.is_file())
+        leftovers.extend(e for e in os.scandir(self.originals_dir)
+                         if e.is_file() and e.name.split('.', 1)[0] not in known_ids)
+        for entry in leftovers:
+            logger.info("Removing orphaned photo blob: %s", entry.name)
+            try:
+                os.remove(entry.path)
+            except OSError as e:
+                logger.warning("Could not remove %s: %s", entry.path, e)
+        
+        return loaded
+
+class PhotoRegistry:
+    """
+    Thread-safe registry of received photos keyed by their unique ID.
+    Lookups are O(1) and iteration follows arrival order. The FastAPI
+    handlers and the Gradio callbacks all share the module-level instance.
+    When a PhotoStore is attached every insert and sent flag is persisted.
+    The version counter changes whenever the listed photos or their sent
+    flags do, so views can skip re-rendering when nothing changed.
+    """
+    def __init__(self, store=None):
+        self._lock = threading.RLock()
+        self._photos = OrderedDict()
+        # IDs of photos being written to the store, not listed yet
+        self._adding = set()
+        self._total_bytes = 0
+        self.store = store
+        self.version = 0
+    
+    def load(self):
+        """Restore the queue from the photo store"""
+        if self.store is None:
+            return 0
+        restored = self.store.load()
+        with self._lock:
+            for photo in restored:
+                self._photos[photo.id] = photo
+                self._total_bytes += photo.size
+            self.version += 1
+            return len(self._photos)
+    
+    def add(self, photo):
+        # Reserve the ID, then write the blob without holding the lock so
+        # concurrent ingests and UI lookups don't wait on each other's fsync
+        with self._lock:
+            if photo.id in self._photos or photo.id in self._adding:
+                raise ValueError(f"Duplicate photo id: {photo.id}")
+            self._adding.add(photo.id)
+        try:
+            blob_name = self.store.write_blob(photo) if self.store is not None else None
+            with self._lock:
+                if self.store is not None:
+                    self.store.insert(photo, blob_name)
+                self._photos[photo.id] = photo
+                self._total_bytes += photo.size
+                self.version += 1
+                return len(self._photos)
+        finally:
+            with self._lock:
+                self._adding.discard(photo.id)
+    
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+    
+    def evict(self, max_count=0, max_bytes=0, max_age=0, archive_unsent=False):
+        """
+        Shrink the live window to the given limits (0 disables a limit).
+        Photos older than max_age go first; after that photos already sent
+        to the display app are evicted before unsent ones, least recently
+        used first. Sent photos are deleted. Unsent photos are only evicted
+        with archive_unsent, and are then archived on disk where they can
+        be listed and restored; the archive counts towards max_bytes and
+        its oldest photos are deleted once the total goes over.
+        Returns the number of photos evicted.
+        """
+        with self._lock:
+            evicted = []
+            if max_age:
+                cutoff = time.time() - max_age
+                evicted.extend(p for p in self._photos.values()
+                               if p.received_at < cutoff and (archive_unsent or p.is_sent))
+            
+            remaining_count = len(self._photos) - len(evicted)
+            remaining_bytes = self._total_bytes - sum(p.size for p in evicted)
+            over_count = max_count and remaining_count > max_count
+            over_bytes = max_bytes and remaining_bytes > max_bytes
+            if over_count or over_bytes:
+                already = {p.id for p in evicted}
+                candidates = sorted(
+                    (p for p in self._photos.values()
+                     if p.id not in already and (archive_unsent or p.is_sent)),
+                    key=lambda p: (not p.is_sent, p.last_access)
+                )
+                for photo in candidates:
+                    if not ((max_count and remaining_count > max_count) or
+                            (max_bytes and remaining_bytes > max_bytes)):
+                        break
+                    evicted.append(photo)
+                    remaining_count -= 1
+                    remaining_bytes -= photo.size
+            
+            for photo in evicted:
+                del self._photos[photo.id]
+                self._total_bytes -= photo.size
+            if evicted:
+                self.version += 1
+            
+            if self.store is not None:
+                if evicted:
+                    self.store.delete([p for p in evicted if p.is_sent])
+                    self.store.archive([p for p in evicted if not p.is_sent])
+                if max_bytes:
+                    self.store.prune_archive(max_bytes - self._total_bytes)
+        
+        for photo in evicted:
+            _preview_images.pop(photo.id)
+        return len(evicted)
+    
+    def archived(self, offset=0, limit=20):
+        """One page of archived photos, newest first. Returns (photos, total)"""
+        if self.store is None:
+            return [], 0
+        return self.store.archived(offset, limit)
+    
+    def restore(self, photo_id):
+        """Move an archived photo back into the live window, None if there is no such photo"""
+        if self.store is None:
+            return None
+        with self._lock:
+            photo = self.store.restore(photo_id)
+            if photo is None:
+                return None
+            photo.last_access = time.time()
+            self._photos[photo.id] = photo
+            self._total_bytes += photo.size
+            self.version += 1
+            return photo
+    
+    def mark_sent(self, photo, is_sent=True):
+        with self._lock:
+            photo.is_sent = is_sent
+            if self.store is not None:
+                self.store.set_sent(photo.id, is_sent)
+            self.version += 1
+    
+    def get(self, photo_id):
+        if not photo_id:
+            return None
+        with self._lock:
+            photo = self._photos.get(photo_id)
+            if photo is not None:
+                photo.last_access = time.time()
+            return photo
+    
+    def query(self, offset=0, limit=20, sent=None, name="", since=None, until=None):
+        """
+        One page of photos, newest first, matching the filters: sent status
+        (None for both), a case-insensitive name substring and a received_at
+        range in seconds since the epoch. Returns (photos, total matches).
+        """
+        name = (name or "").strip().lower()
+        filtered = sent is not None or name or since is not None or until is not None
+        with self._lock:
+            if not filtered:
+                total = len(self._photos)
+                page = list(itertools.islice(reversed(self._photos.values()), offset, offset + limit))
+                return page, total
+            page = []
+            total = 0
+            for photo in reversed(self._photos.values()):
+                if sent is not None and photo.is_sent != sent:
+                    continue
+                if name and name not in (photo.name or "").lower():
+                    continue
+                if since is not None and photo.received_at < since:
+                    continue
+                if until is not None and photo.received_at > until:
+                    continue
+                if offset <= total < offset + limit:
+                    page.append(photo)
+                total += 1
+            return page, total
+    
+    def snapshot(self):
+        """List of photos in arrival order, safe to use without holding the lock"""
+        with self._lock:
+            return list(self._photos.values())
+    
+    def __iter__(self):
+        return iter(self.snapshot())
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._photos)
+    
+    def __contains__(self, photo_id):
+        with self._lock:
+            return photo_id in self._photos
+
+def create_photo_registry():
+    """Create the shared registry, falling back to memory only if the store is unavailable"""
+    try:
+        registry = PhotoRegistry(PhotoStore(PHOTO_STORE_DIR))
+        restored = registry.load()
+        logger.info("Restored %s photos from %s", restored, PHOTO_STORE_DIR)
+        return registry
+    except Exception as e:
+        logger.warning("Could not open photo store, photos will not persist: %s", e, exc_info=True)
+        return PhotoRegistry()
+
+# Store received photos
+photos = create_photo_registry()
+
+def get_option(name, default):
+    """Read one of this extension's settings, falling back to its default"""
+    try:
+        value = getattr(shared.opts, name, default)
+    except Exception:
+        value = default
+    return default if value is None else value
+
+def apply_retention():
+    """Enforce the configured retention limits on the received photos"""
+    try:
+        evicted = photos.evict(
+            max_count=int(get_option("photo_message_max_photos", 500)),
+            max_bytes=int(float(get_option("photo_message_max_total_mb", 2048)) * 1024 * 1024),
+            max_age=int(float(get_option("photo_message_max_age_hours", 0)) * 3600),
+            archive_unsent=bool(get_option("photo_message_archive_unsent", False))
+        )
+        if evicted:
+            logger.info("Evicted %s photos, %s left in the live window", evicted, len(photos))
+    except Exception as e:
+        logger.exception("Error applying retention: %s", e)
+
+def on_ui_settings():
+    """Register the extension's settings"""
+    section = ('photo_message', "Photo Message")
+    shared.opts.add_option("photo_message_max_photos", shared.OptionInfo(
+        500, "Maximum number of received photos kept in the list (0 = unlimited)",
+        gr.Number, {"precision": 0}, section=section))
+    shared.opts.add_option("photo_message_max_total_mb", shared.OptionInfo(
+        2048, "Maximum total size of received photos in MB (0 = unlimited)",
+        gr.Number, section=section))
+    shared.opts.add_option("photo_message_max_age_hours", shared.OptionInfo(
+        0, "Remove received photos older than this many hours (0 = keep)",
+        gr.Number, section=section))
+    shared.opts.add_option("photo_message_archive_unsent", shared.OptionInfo(
+        False, "Let these limits archive photos not yet sent to the display app (restore them through the API)",
+        section=section))
+    shared.opts.add_option("photo_message_photo_page_size", shared.OptionInfo(
+        20, "Received photos per page",
+        gr.Slider, {"minimum": 5, "maximum": 100, "step": 5}, section=section))
+    shared.opts.add_option("photo_message_gallery_page_size", shared.OptionInfo(
+        20, "Generated images shown per gallery page",
+        gr.Slider, {"minimum": 4, "maximum": 100, "step": 4}, section=section))
+    shared.opts.add_option("photo_message_gallery_max_age_minutes", shared.OptionInfo(
+        60, "Only show generated images newer than this many minutes (0 = all)",
+        gr.Number, {"precision": 0}, section=section))
+    shared.opts.add_option("photo_message_http_pool_size", shared.OptionInfo(
+        4, "Connections kept open to the display app",
+        gr.Slider, {"minimum": 1, "maximum": 32, "step": 1}, section=section))
+    shared.opts.add_option("photo_message_http_connect_timeout", shared.OptionInfo(
+        3, "Display app connect timeout in seconds",
+        gr.Number, section=section))
+    shared.opts.add_option("photo_message_http_read_timeout", shared.OptionInfo(
+        10, "Display app response timeout in seconds",
+        gr.Number, section=section))
+    shared.opts.add_option("photo_message_delivery_format", shared.OptionInfo(
+        "base64", "How images are sent to the display app over HTTP (binary needs display app support)",
+        gr.Radio, {"choices": DELIVERY_FORMATS}, section=section))
+    shared.opts.add_option("photo_message_ingest_max_edge", shared.OptionInfo(
+        2048, "Downscale received photos so the long edge is at most this many pixels (0 = keep size)",
+        gr.Number, {"precision": 0}, section=section))
+    shared.opts.add_option("photo_message_ingest_format", shared.OptionInfo(
+        "JPEG", "Re-encode received photos as",
+        gr.Radio, {"choices": INGEST_FORMATS}, section=section))
+    shared.opts.add_option("photo_message_ingest_quality", shared.OptionInfo(
+        90, "Quality for re-encoded JPEG/WEBP photos",
+        gr.Slider, {"minimum": 50, "maximum": 100, "step": 1}, section=section))
+    shared.opts.add_option("photo_message_keep_originals", shared.OptionInfo(
+        False, "Keep the original upload on disk when a photo is downscaled or re-encoded",
+        section=section))
+    shared.opts.add_option("photo_message_temp_max_mb", shared.OptionInfo(
+        512, "Maximum size of the temp files handed to other tabs in MB",
+        gr.Slider, {"minimum": 16, "maximum": 8192, "step": 16}, section=section))
+    shared.opts.add_option("photo_message_temp_max_age_hours", shared.OptionInfo(
+        24, "Remove temp files handed to other tabs after this many hours (0 = keep)",
+        gr.Slider, {"minimum": 0, "maximum": 168, "step": 1}, section=section))
+    shared.opts.add_option("photo_message_log_level", shared.OptionInfo(
+        "INFO", "Log level", gr.Radio, {"choices": LOG_LEVELS},
+        onchange=configure_logging, section=section))
+    shared.opts.add_option("photo_message_log_async", shared.OptionInfo(
+        False, "Write log messages from a background thread",
+        onchange=configure_logging, section=section))
+
+# Formats received photos can be re-encoded to; "Original" keeps the upload's format
+INGEST_FORMATS = ["Original", "JPEG", "WEBP", "PNG"]
+EXIF_ORIENTATION = 0x0112
+
+def apply_ingest_pipeline(photo):
+    """
+    Downscale, orient and re-encode a freshly received photo according to the
+    settings. EXIF orientation is applied to the pixels and the metadata is
+    dropped. Photos that are already small enough, carry no metadata and are
+    in the target format are left untouched. Returns True if re-encoded.
+    """
+    max_edge = int(get_option("photo_message_ingest_max_edge", 2048))
+    target_format = get_option("photo_message_ingest_format", "JPEG")
+    quality = int(get_option("photo_message_ingest_quality", 90))
+    keep_original = bool(get_option("photo_message_keep_originals", False))
+    
+    staged_path = photo.blob_path
+    source = io.BytesIO(photo._bytes) if photo._bytes is not None else staged_path
+    with Image.open(source) as opened:
+        original_format = opened.format
+        image_format = original_format if target_format == "Original" else target_format
+        if image_format not in INGEST_FORMATS:
+            image_format = "JPEG"
+        too_large = max_edge > 0 and max(opened.size) > max_edge
+        has_metadata = bool(opened.info.get('exif') or opened.info.get('xmp'))
+        if not too_large and not has_metadata and image_format == original_format:
+            return False
+        
+        if too_large and original_format == 'JPEG':
+            # Let the JPEG decoder skip detail we are about to throw away
+            opened.draft('RGB', (max_edge, max_edge))
+        image = ImageOps.exif_transpose(opened)
+    
+    if too_large:
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    for key in ('exif', 'xmp', 'XML:com.adobe.xmp'):
+        image.info.pop(key, None)
+    
+    buffer = io.BytesIO()
+    save_args = {'quality': quality} if image_format in ('JPEG', 'WEBP') else {}
+    image.save(buffer, format=image_format, **save_args)
+    logger.info("Re-encoded %s %sx%s (%s bytes) to %s %sx%s (%s bytes)",
+                original_format, photo.width, photo.height, photo.size,
+                image_format, image.width, image.height, buffer.tell())
+    
+    if keep_original and photos.store is not None:
+        photos.store.save_original(photo.id, original_format, staged_path or photo._bytes)
+    elif staged_path:
+        os.remove(staged_path)
+    photo.replace_image(buffer.getvalue(), image_format, image.size)
+    return True
+
+def run_ingest_pipeline(photo):
+    """Apply the ingest pipeline, keeping the photo as received if it fails"""
+    if not photo.has_image:
+        return
+    try:
+        apply_ingest_pipeline(photo)
+    except Exception as e:
+        logger.warning("Ingest pipeline failed, keeping photo as received: %s", e, exc_info=True)
+
+# Bounded pool for the CPU-bound part of receiving a photo (base64 decode,
+# PIL verify, blob write) so uploads never run on the uvicorn event loop
+INGEST_WORKERS = min(8, os.cpu_count() or 2)
+ingest_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="photo_message_ingest")
+
+def ingest_photo(image_data, name, message, strict=False):
+    """
+    Validate, persist and register a received photo. With strict set an
+    invalid image raises ValueError instead of being queued without an image.
+    """
+    photo = PhotoMessage(
+        image_data=image_data,
+        name=name,
+        message=message,
+        timestamp=datetime.now().isoformat()
+    )
+    if strict and not photo.has_image:
+        raise ValueError("Invalid image data")
+    run_ingest_pipeline(photo)
+    total = photos.add(photo)
+    logger.info("Added photo to queue. Total photos: %s", total)
+    apply_retention()
+    return photo
+
+def ingest_photo_file(path, name, message):
+    """Validate, persist and register a photo that was streamed to a staging file"""
+    try:
+        photo = PhotoMessage.from_file(path, name, message, datetime.now().isoformat())
+    except Exception:
+        os.remove(path)
+        raise
+    run_ingest_pipeline(photo)
+    total = photos.add(photo)
+    logger.info("Added photo to queue. Total photos: %s", total)
+    apply_retention()
+    return photo
+
+# Largest upload accepted by the binary receive endpoint
+MAX_UPLOAD_BYTES = 64 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+def staging_path():
+    """New file path to stream an incoming upload to"""
+    if photos.store is not None:
+        staging_dir = photos.store.staging_dir
+    else:
+        staging_dir = os.path.join(tempfile.gettempdir(), "photo_message")
+        os.makedirs(staging_dir, exist_ok=True)
+    return os.path.join(staging_dir, f"{uuid.uuid4().hex}.part")
+
+# Largest text field (name, message) accepted in a multipart upload
+MAX_FORM_FIELD_BYTES = 64 * 1024
+
+async def request_body_chunks(request):
+    """
+    The request body in UPLOAD_CHUNK_SIZE pieces as it arrives. Bodies over
+    MAX_UPLOAD_BYTES are rejected up front by their Content-Length, and
+    while streaming for chunked requests that don't declare one.
+    """
+    content_length = request.headers.get('content-length', '')
+    if content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image is too large")
+    received = 0
+    buffer = bytearray()
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Image is too large")
+        buffer += chunk
+        if len(buffer) >= UPLOAD_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+async def stage_request_body(request):
+    """
+    Stream a raw request body to a staging file as it arrives. The chunks
+    are written from a worker thread so the event loop never waits on the
+    disk.
+    """
+    path = staging_path()
+    f = await run_in_threadpool(open, path, 'wb')
+    try:
+        async for chunk in request_body_chunks(request):
+            await run_in_threadpool(f.write, chunk)
+        await run_in_threadpool(f.close)
+    except Exception:
+        await run_in_threadpool(f.close)
+        await run_in_threadpool(os.remove, path)
+        raise
+    return path
+
+class MultipartUpload:
+    """
+    Streaming parser for a multipart/form-data photo upload. The image file
+    part is written straight to a staging file as the body arrives, and the
+    text fields are kept in memory, so the upload is never spooled or copied.
+    write() does blocking file I/O and is meant to run in a worker thread.
+    """
+    FIELDS = ('name', 'message')
+    
+    def __init__(self, boundary):
+        self.path = None
+        self.fields = {}
+        self._file = None
+        self._target = None
+        self._headers = {}
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._ended = False
+        self._parser = MultipartParser(boundary, {
+            'on_part_begin': self._part_begin,
+            'on_header_field': lambda data, start, end: self._header_field.extend(data[start:end]),
+            'on_header_value': lambda data, start, end: self._header_value.extend(data[start:end]),
+            'on_header_end': self._header_end,
+            'on_headers_finished': self._headers_finished,
+            'on_part_data': self._part_data,
+            'on_part_end': self._part_end,
+            'on_end': self._end
+        })
+    
+    def _part_begin(self):
+        self._headers = {}
+        self._target = None
+    
+    def _header_end(self):
+        self._headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+    
+    def _headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b'content-disposition', b''))
+        name = options.get(b'name', b'').decode('utf-8', 'replace')
+        if name == 'image' and b'filename' in options and self.path is None:
+            self.path = staging_path()
+            self._file = open(self.path, 'wb')
+            self._target = self._file
+        elif name in self.FIELDS:
+            self._target = self.fields[name] = bytearray()
+    
+    def _part_data(self, data, start, end):
+        if self._target is None:
+            return
+        if self._target is self._file:
+            self._file.write(data[start:end])
+            return
+        if len(self._target) + end - start > MAX_FORM_FIELD_BYTES:
+            raise HTTPException(status_code=413, detail="Form field is too large")
+        self._target.extend(data[start:end])
+    
+    def _part_end(self):
+        if self._file is not None and self._target is self._file:
+            self._file.close()
+        self._target = None
+    
+    def _end(self):
+        self._ended = True
+    
+    def write(self, chunk):
+        self._parser.write(chunk)
+    
+    def finish(self):
+        """Check the body ended properly, returns (staged image path or None, text fields)"""
+        self._parser.finalize()
+        if not self._ended:
+            raise HTTPException(status_code=400, detail="Incomplete multipart body")
+        return self.path, {name: bytes(value).decode('utf-8', 'replace') for name, value in self.fields.items()}
+    
+    def abort(self):
+        """Drop a partly staged image"""
+        if self._file is not None:
+            self._file.close()
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+async def stage_multipart_upload(request):
+    """
+    Stream a multipart/form-data upload into a staging file as it arrives.
+    Returns (staged image path, fields) with the name and message fields.
+    """
+    _, options = parse_options_header(request.headers.get('content-type', ''))
+    boundary = options.get(b'boundary')
+    if not boundary:
+        raise HTTPException(status_code=400, detail="Missing multipart boundary")
+    upload = MultipartUpload(boundary)
+    try:
+        async for chunk in request_body_chunks(request):
+            await run_in_threadpool(upload.write, chunk)
+        path, fields = await run_in_threadpool(upload.finish)
+    except Exception:
+        await run_in_threadpool(upload.abort)
+        raise
+    if path is None:
+        raise HTTPException(status_code=400, detail="Missing image file field")
+    return path, fields
+
+async def run_in_ingest_pool(fn, *args):
+    """Run fn in the ingest pool and wait for it without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(ingest_executor, functools.partial(fn, *args))
 
 class PhotoRequest(BaseModel):
     image: str
@@ -273,18 +1430,71 @@ class PhotoRequest(BaseModel):
     message: str
     display_app_url: str | None = None
 
+# Largest number of photos accepted in one batch request
+MAX_BATCH_SIZE = 100
+
+class PhotoBatchRequest(BaseModel):
+    photos: list[PhotoRequest]
+
+def api_credentials():
+    """Users and passwords from --api-auth, empty when the API is unprotected"""
+    credentials = {}
+    for pair in (getattr(shared.cmd_opts, 'api_auth', None) or '').split(','):
+        user, separator, password = pair.strip().partition(':')
+        if separator:
+            credentials[user] = password
+    return credentials
+
+# Signs the photo URLs given to the photo tab, so its own fetches work when
+# only --api-auth protects the API; a new key on every WebUI start
+PHOTO_URL_KEY = secrets.token_bytes(32)
+
+def photo_access_token(photo_id):
+    """Token that lets the photo tab fetch one stored photo without API credentials"""
+    return hmac.new(PHOTO_URL_KEY, photo_id.encode(), hashlib.sha256).hexdigest()
+
+def read_access(app):
+    """
+    FastAPI dependency for the endpoints that expose received photos and
+    generations. With --api-auth set, its HTTP Basic credentials are
+    accepted; with a WebUI login (--gradio-auth) the logged-in browser
+    session is too, which is what the photo tab's own requests carry.
+    Without either the endpoints are as open as the WebUI itself, so a
+    --listen WebUI should set one of them. A photo URL signed for the
+    photo tab is accepted for that photo as well.
+    """
+    async def check(request: Request,
+                    basic: HTTPBasicCredentials | None = Depends(HTTPBasic(auto_error=False))):
+        credentials = api_credentials()
+        if not credentials and not getattr(app, 'auth', None):
+            return
+        photo_id = request.path_params.get('photo_id')
+        token = request.query_params.get('token')
+        if request.method == 'GET' and photo_id and token and \
+                hmac.compare_digest(token, photo_access_token(photo_id)):
+            return
+        tokens = getattr(app, 'tokens', None) or {}
+        if any(name.startswith('access-token') and value in tokens for name, value in request.cookies.items()):
+            return
+        if basic is not None and basic.username in credentials and \
+                secrets.compare_digest(basic.password, credentials[basic.username]):
+            return
+        raise HTTPException(status_code=401, detail="Incorrect username or password",
+                            headers={"WWW-Authenticate": "Basic"} if credentials else None)
+    return check
+
 def api_only(app: FastAPI):
     """Register API endpoints only"""
-    print("\n[Photo Message] Registering API endpoints...")
-    print(f"[Photo Message] FastAPI app info: {app}")
+    logger.debug("Registering API endpoints...")
     
     try:
+        # Endpoints beyond receiving photos expose guests' photos, prompts and
+        # delivery state, so they need a login when the WebUI has one
+        authenticated = [Depends(read_access(app))]
+        
         @app.get("/sdapi/v1/photo_message/ping")
         async def ping(request: Request):
-            print(f"[Photo Message] Ping request received")
-            print(f"[Photo Message] Request base URL: {request.base_url}")
-            print(f"[Photo Message] Request headers: {request.headers}")
-            print(f"[Photo Message] Request client: {request.client}")
+            logger.debug("Ping request from %s", request.client)
             return {
                 "status": "ok", 
                 "message": "Photo Message extension is alive!",
@@ -293,582 +1503,1531 @@ def api_only(app: FastAPI):
                 "client": str(request.client)
             }
             
-        print("[Photo Message] Registered ping endpoint")
+        logger.debug("Registered ping endpoint")
         
         @app.get("/sdapi/v1/photo_message/test")
         async def test(request: Request):
-            print(f"[Photo Message] Test request received from: {request.client}")
+            logger.debug("Test request received from: %s", request.client)
             return {
                 "status": "success", 
                 "message": "Photo Message extension is working!",
                 "client": str(request.client)
             }
             
-        print("[Photo Message] Registered test endpoint")
+        logger.debug("Registered test endpoint")
         
         @app.post("/sdapi/v1/photo_message/receive")
         async def receive_photo(data: PhotoRequest, request: Request):
-            print(f"[Photo Message] Receive endpoint hit from: {request.client}")
-            print(f"[Photo Message] Request data: name={data.name}, message={data.message}")
+            logger.debug("Receive endpoint hit from: %s", request.client)
+            logger.debug("Request data: name=%s, message=%s", data.name, data.message)
             
             try:
-                photo = PhotoMessage(
-                    image_data=data.image,
-                    name=data.name,
-                    message=data.message,
-                    timestamp=datetime.now().isoformat()
-                )
-                photos.append(photo)
-                print(f"[Photo Message] Added photo to queue. Total photos: {len(photos)}")
+                # Decoding and verifying a full-size photo is CPU bound, keep it off the event loop
+                photo = await run_in_ingest_pool(ingest_photo, data.image, data.name, data.message)
                 
                 return {
                     "status": "success", 
                     "message": f"Photo received from {data.name}",
+                    "id": photo.id,
                     "timestamp": photo.timestamp,
                     "client": str(request.client)
                 }
             except Exception as e:
                 error_msg = f"Error processing request: {str(e)}"
-                print(f"[Photo Message] {error_msg}")
-                print(traceback.format_exc())
+                logger.exception("%s", error_msg)
                 raise HTTPException(status_code=500, detail=error_msg)
                 
-        print("[Photo Message] Registered receive endpoint")
+        logger.debug("Registered receive endpoint")
+        
+        @app.post("/sdapi/v1/photo_message/receive_binary")
+        async def receive_photo_binary(request: Request, name: str = "", message: str = ""):
+            """
+            Receive a photo without base64 overhead, either as multipart/form-data
+            (fields: image, name, message) or as a raw image/* body with name and
+            message passed as query parameters.
+            """
+            logger.debug("Binary receive endpoint hit from: %s", request.client)
+            content_type = request.headers.get('content-type', '')
+            
+            try:
+                if content_type.startswith('multipart/form-data'):
+                    path, fields = await stage_multipart_upload(request)
+                    name = fields.get('name', name)
+                    message = fields.get('message', message)
+                elif content_type.startswith('image/'):
+                    path = await stage_request_body(request)
+                else:
+                    raise HTTPException(status_code=415, detail="Expected multipart/form-data or an image/* body")
+                
+                logger.debug("Request data: name=%s, message=%s", name, message)
+                try:
+                    photo = await run_in_ingest_pool(ingest_photo_file, path, name, message)
+                except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+                    raise HTTPException(status_code=400, detail=f"Invalid image: {e}")
+                
+                return {
+                    "status": "success", 
+                    "message": f"Photo received from {name}",
+                    "id": photo.id,
+                    "timestamp": photo.timestamp,
+                    "client": str(request.client)
+                }
+            except HTTPException:
+                raise
+            except Exception as e:
+                error_msg = f"Error processing request: {str(e)}"
+                logger.exception("%s", error_msg)
+                raise HTTPException(status_code=500, detail=error_msg)
+                
+        logger.debug("Registered binary receive endpoint")
+        
+        @app.post("/sdapi/v1/photo_message/receive_batch")
+        async def receive_photo_batch(data: PhotoBatchRequest, request: Request):
+            """Receive many photos in one request, validated in parallel, with a status per item"""
+            logger.debug("Batch receive endpoint hit from: %s (%s photos)", request.client, len(data.photos))
+            if len(data.photos) > MAX_BATCH_SIZE:
+                raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} photos per batch")
+            
+            results = await asyncio.gather(
+                *(run_in_ingest_pool(ingest_photo, item.image, item.name, item.message, True)
+                  for item in data.photos),
+                return_exceptions=True
+            )
+            
+            items = []
+            for index, (item, result) in enumerate(zip(data.photos, results)):
+                if isinstance(result, Exception):
+                    logger.warning("Batch item %s from %s failed: %s", index, item.name, result)
+                    items.append({
+                        "index": index,
+                        "status": "error",
+                        "message": str(result)
+                    })
+                else:
+                    items.append({
+                        "index": index,
+                        "status": "success",
+                        "message": f"Photo received from {item.name}",
+                        "id": result.id,
+                        "timestamp": result.timestamp
+                    })
+            
+            received = sum(1 for item in items if item["status"] == "success")
+            logger.info("Batch complete: %s/%s photos received", received, len(items))
+            if received == len(items):
+                status = "success"
+            else:
+                status = "partial" if received else "error"
+            return {
+                "status": status,
+                "received": received,
+                "failed": len(items) - received,
+                "items": items,
+                "client": str(request.client)
+            }
+            
+        logger.debug("Registered batch receive endpoint")
+        
+        @app.get("/sdapi/v1/photo_message/photo/{photo_id}", dependencies=authenticated)
+        async def get_photo(photo_id: str):
+            """Serve the full-size stored image of a received photo"""
+            photo = photos.get(photo_id)
+            if photo is None or not photo.has_image:
+                raise HTTPException(status_code=404, detail="Photo not found")
+            if photo.blob_path:
+                return FileResponse(photo.blob_path, media_type=photo.mime_type)
+            return Response(content=photo.image_bytes, media_type=photo.mime_type)
+            
+        logger.debug("Registered photo endpoint")
+        
+        @app.get("/sdapi/v1/photo_message/photos", dependencies=authenticated)
+        async def list_photos(page: int = 1, page_size: int = 0, sent: bool | None = None, name: str = "",
+                              since: str | None = None, until: str | None = None):
+            """
+            Paginated list of received photos, newest first, filtered by sent
+            status, name and an ISO timestamp range. The version changes
+            whenever the list does, so clients can skip unchanged refreshes.
+            """
+            try:
+                since = datetime.fromisoformat(since).timestamp() if since else None
+                until = datetime.fromisoformat(until).timestamp() if until else None
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid time range: {e}")
+            page = max(1, page)
+            page_size = min(max(1, page_size or int(get_option("photo_message_photo_page_size", 20))), 200)
+            version = photos.version
+            rows, total = photos.query((page - 1) * page_size, page_size, sent=sent, name=name,
+                                       since=since, until=until)
+            return {
+                'photos': [photo.info() for photo in rows],
+                'page': page,
+                'page_size': page_size,
+                'total': total,
+                'version': version
+            }
+            
+        logger.debug("Registered photo list endpoint")
+        
+        @app.get("/sdapi/v1/photo_message/archived", dependencies=authenticated)
+        async def list_archived_photos(page: int = 1, page_size: int = 0):
+            """Paginated list of unsent photos archived by the retention limits, newest first"""
+            page = max(1, page)
+            page_size = min(max(1, page_size or int(get_option("photo_message_photo_page_size", 20))), 200)
+            rows, total = await run_in_threadpool(photos.archived, (page - 1) * page_size, page_size)
+            return {
+                'photos': [photo.info() for photo in rows],
+                'page': page,
+                'page_size': page_size,
+                'total': total
+            }
+        
+        @app.post("/sdapi/v1/photo_message/archived/{photo_id}/restore", dependencies=authenticated)
+        async def restore_archived_photo(photo_id: str):
+            """Move an archived photo back into the received photos list"""
+            photo = await run_in_threadpool(photos.restore, photo_id)
+            if photo is None:
+                raise HTTPException(status_code=404, detail="Archived photo not found")
+            return photo.info()
+            
+        logger.debug("Registered archived photo endpoints")
+        
+        @app.get("/sdapi/v1/photo_message/generations", dependencies=authenticated)
+        async def list_generations(page: int = 1, page_size: int = 0, max_age_minutes: float | None = None, query: str = ""):
+            """Paginated list of the newest generated images with their cached generation info"""
+            page_size = page_size or int(get_option("photo_message_gallery_page_size", 20))
+            if max_age_minutes is None:
+                max_age_minutes = float(get_option("photo_message_gallery_max_age_minutes", 60))
+            page_size = min(max(1, page_size), 200)
+            
+            def build_page():
+                image_paths, has_more = get_recent_generations(page, page_size, max_age_minutes * 60, query)
+                items = []
+                for path, mtime in image_paths:
+                    item = {"path": path, "mtime": mtime}
+                    try:
+                        info = generation_info_cache.get(path)
+                        item.update({k: v for k, v in info.items() if k != 'raw'})
+                    except Exception as e:
+                        logger.warning("Could not read image info for %s: %s", path, e)
+                    items.append(item)
+                return items, has_more
+            
+            # Reading generation info can hit the disk, keep it off the event loop
+            items, has_more = await run_in_threadpool(build_page)
+            return {
+                "page": max(1, page),
+                "page_size": page_size,
+                "has_more": has_more,
+                "items": items
+            }
+            
+        logger.debug("Registered generations endpoint")
+        
+        @app.get("/sdapi/v1/photo_message/deliveries/{job_id}", dependencies=authenticated)
+        async def get_delivery(job_id: str):
+            """Status of a queued delivery to the display app"""
+            job = delivery_queue.get(job_id)
+            if job is None:
+                raise HTTPException(status_code=404, detail="Delivery not found")
+            return job.info()
+            
+        logger.debug("Registered delivery status endpoint")
+        
+        @app.get("/sdapi/v1/photo_message/display_app", dependencies=authenticated)
+        async def get_display_app_health():
+            """Connection state of the display app and deliveries waiting on it"""
+            return {
+                **display_app_connection.health(),
+                'awaiting_ack': delivery_queue.pending_count(),
+                'waiting': delivery_queue.waiting_count()
+            }
+            
+        logger.debug("Registered display app health endpoint")
         
     except Exception as e:
-        print(f"[Photo Message] Error registering endpoints: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error registering endpoints: %s", e)
 
 def on_app_started(demo: gr.Blocks, app: FastAPI):
     """Main callback when the app starts"""
-    print("\n[Photo Message] App started callback triggered")
-    print(f"[Photo Message] Gradio Blocks type: {type(demo)}")
-    print(f"[Photo Message] FastAPI app type: {type(app)}")
+    logger.debug("App started callback triggered")
+    
+    # Connect to the display app in the background, startup never waits on it
+    display_app_connection.start()
+    
+    # Evict old hand-off temp files in the background
+    temp_artifacts.start()
+    
+    try:
+        # Keep the Generated Images feed current in the background
+        output_watcher.start()
+    except Exception as e:
+        logger.warning("Could not start output watcher: %s", e, exc_info=True)
     
     if app is None:
-        print("[Photo Message] Error: FastAPI app is None!")
+        logger.error("FastAPI app is None")
         return
         
     if not isinstance(app, FastAPI):
-        print(f"[Photo Message] Error: Expected FastAPI app, got {type(app)}")
+        logger.error("Expected FastAPI app, got %s", type(app))
         return
     
     try:
         # Register API endpoints using the FastAPI app
         api_only(app)
-        print("[Photo Message] API registration completed")
+        logger.info("API registration completed")
     except Exception as e:
-        print(f"[Photo Message] Error in app_started: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error in app_started: %s", e)
 
-def get_photo_by_timestamp(timestamp):
-    """Get a photo from the photos list by its timestamp"""
-    for photo in photos:
-        if photo.timestamp == timestamp:
-            try:
-                print(f"[Photo Message] Found photo for timestamp: {timestamp}")
-                print(f"[Photo Message] Image data type: {type(photo.image_data)}")
-                print(f"[Photo Message] Image data length: {len(photo.image_data)}")
-                
-                # Get raw base64 data
-                image_data = photo.image_data
-                
-                # Remove data URL prefix if present
-                if isinstance(image_data, str) and 'base64,' in image_data:
-                    print("[Photo Message] Removing data URL prefix")
-                    image_data = image_data.split('base64,')[1]
-                
-                # Add padding if needed
-                padding = len(image_data) % 4
-                if padding:
-                    print("[Photo Message] Adding base64 padding")
-                    image_data += '=' * (4 - padding)
-                
+PHOTO_LIST_COLUMNS = ["ID", "Time", "Name", "Message", "Sent"]
+
+PHOTO_SENT_FILTERS = ["All", "Unsent", "Sent"]
+PHOTO_LIST_POLL_SECONDS = 2
+
+def sent_filter_value(sent):
+    """Registry query value for a PHOTO_SENT_FILTERS choice"""
+    return {"Unsent": False, "Sent": True}.get(sent)
+
+def update_photo_list(page=1, page_size=None, sent="All", name="", within_minutes=0):
+    """
+    One page of the received photos for the table, newest first and filtered
+    on the server. Returns (DataFrame of the page, page info, page number),
+    the page clamped to the pages that exist.
+    """
+    apply_retention()
+    page_size = max(1, int(page_size or get_option("photo_message_photo_page_size", 20)))
+    page = max(1, int(page or 1))
+    since = time.time() - float(within_minutes) * 60 if within_minutes else None
+    query = dict(sent=sent_filter_value(sent), name=name, since=since)
+    
+    rows, total = photos.query((page - 1) * page_size, page_size, **query)
+    pages = max(1, -(-total // page_size))
+    if page > pages:
+        page = pages
+        rows, total = photos.query((page - 1) * page_size, page_size, **query)
+    logger.debug("Updating photo list page %s with %s of %s photos", page, len(rows), total)
+    
+    photo_data = [[p.id, p.timestamp, p.name, p.message, "✓" if p.is_sent else ""] for p in rows]
+    df = pd.DataFrame(photo_data, columns=PHOTO_LIST_COLUMNS)
+    return df, f"Page {page} of {pages} · {total} photos", page
+
+def photo_list_key(page, sent, name, within_minutes):
+    """What the rendered table depends on, an unchanged key means an unchanged page"""
+    # Relative time windows move, re-render at most once a minute for them
+    minute = int(time.time() // 60) if within_minutes else 0
+    return [photos.version, int(page or 1), sent, name or "", float(within_minutes or 0), minute]
+
+def refresh_photo_list(page, sent, name, within_minutes):
+    key = photo_list_key(page, sent, name, within_minutes)
+    df, page_info, page = update_photo_list(page, None, sent, name, within_minutes)
+    return df, page_info, page, key
+
+def poll_photo_list(last_key, page, sent, name, within_minutes):
+    """Re-render the photo table only when its page could have changed"""
+    key = photo_list_key(page, sent, name, within_minutes)
+    if key == last_key:
+        return gr.update(), gr.update(), gr.update(), last_key
+    df, page_info, page = update_photo_list(page, None, sent, name, within_minutes)
+    return df, page_info, page, key
+
+class ReactorComponents:
+    """
+    ReActor's img2img script and its mounted "enable" and source image
+    components. Discovered once, after the img2img tab has been built, and
+    invalidated when scripts are unloaded so a reload finds the new ones.
+    """
+    SCRIPT_MODULE = 'reactor_faceswap'
+    
+    def __init__(self):
+        self.script = None
+        self.enabled = None
+        self.source = None
+        self._resolved = False
+        self._lock = threading.Lock()
+    
+    @property
+    def available(self):
+        return self.enabled is not None and self.source is not None
+    
+    def resolve(self):
+        """Discover the components if not done yet, returning self"""
+        with self._lock:
+            if not self._resolved:
+                self._resolved = self._discover()
+        return self
+    
+    def invalidate(self):
+        with self._lock:
+            self.script = self.enabled = self.source = None
+            self._resolved = False
+    
+    def _discover(self):
+        """Look up the components, False if the img2img UI is not built yet"""
+        runner = getattr(scripts, 'scripts_img2img', None)
+        if runner is None or not getattr(runner, 'inputs', None):
+            return False
+        
+        for script in runner.alwayson_scripts:
+            source_file = f"{type(script).__module__} {getattr(script, 'filename', '')}".lower()
+            if self.SCRIPT_MODULE in source_file:
+                break
+        else:
+            logger.info("ReActor extension not found")
+            return True
+        if script.args_from is None or script.args_to is None:
+            return False
+        
+        enabled = source = None
+        controls = runner.inputs[script.args_from:script.args_to]
+        for elem in controls:
+            elem_id = str(getattr(elem, 'elem_id', '') or '').lower()
+            if 'reactor_enabled' in elem_id:
+                enabled = elem
+            elif 'reactor_source' in elem_id and isinstance(elem, gr.Image):
+                source = elem
+        # Versions without those element ids: the enable checkbox and the
+        # source image are ReActor's first checkbox and first image
+        enabled = enabled or next((elem for elem in controls if isinstance(elem, gr.Checkbox)), None)
+        source = source or next((elem for elem in controls if isinstance(elem, gr.Image)), None)
+        
+        self.script, self.enabled, self.source = script, enabled, source
+        if self.available:
+            logger.info("Found ReActor components in %s", type(script).__module__)
+        else:
+            logger.warning("Could not find ReActor's components")
+        return True
+
+reactor_components = ReactorComponents()
+
+class TempArtifactCache:
+    """
+    Content-addressed files in the temp directory for images handed to other
+    parts of the WebUI. Files are named after a hash of their bytes, so
+    sending the same photo again reuses its file, and a background sweep
+    removes files past the age limit and the oldest ones past the size limit.
+    """
+    SWEEP_INTERVAL = 300
+    
+    def __init__(self, root, max_bytes, max_age):
+        self.root = root
+        # Callables, so changed settings apply on the next sweep
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="photo_message_temp_cache", daemon=True)
+            self._thread.start()
+    
+    def put(self, data, extension):
+        """Path of a file holding data, written only if not cached yet"""
+        name = f"{hashlib.sha256(data).hexdigest()[:32]}.{extension}"
+        path = os.path.join(self.root, name)
+        try:
+            # Refresh the mtime, the sweep evicts least recently used first
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
+    
+    def prune(self):
+        """Remove expired files, then the oldest until the cache fits its size limit"""
+        try:
+            # Uploads in progress are staged here too when there is no photo store
+            entries = [e for e in os.scandir(self.root) if e.is_file() and not e.name.endswith('.part')]
+        except FileNotFoundError:
+            return
+        
+        now = time.time()
+        max_age = self.max_age()
+        max_bytes = self.max_bytes()
+        files = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in entries), reverse=True)
+        kept = 0
+        removed = 0
+        for mtime, size, path in files:
+            if (max_age and now - mtime > max_age) or kept + size > max_bytes:
                 try:
-                    # First try to decode base64
-                    print("[Photo Message] Attempting to decode base64")
-                    image_bytes = base64.b64decode(image_data)
-                    print(f"[Photo Message] Decoded bytes length: {len(image_bytes)}")
-                    
-                    # Try to create PIL Image
-                    print("[Photo Message] Creating PIL Image")
-                    image = Image.open(io.BytesIO(image_bytes))
-                    
-                    # Verify it's a valid image
-                    print("[Photo Message] Verifying image")
-                    image.verify()
-                    
-                    # Reopen for actual use (verify closes the file)
-                    image = Image.open(io.BytesIO(image_bytes))
-                    
-                    # Convert to RGB if needed
-                    if image.mode != 'RGB':
-                        print(f"[Photo Message] Converting from {image.mode} to RGB")
-                        image = image.convert('RGB')
-                    
-                    print("[Photo Message] Successfully loaded image")
-                    return image
-                    
-                except base64.binascii.Error as be:
-                    print(f"[Photo Message] Base64 decode error: {be}")
-                    print(f"[Photo Message] Base64 string preview: {image_data[:100]}...")
-                    return None
-                except PIL.UnidentifiedImageError as pie:
-                    print(f"[Photo Message] PIL error: {pie}")
-                    print(f"[Photo Message] First few bytes: {image_bytes[:20].hex()}")
-                    return None
-                    
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+            else:
+                kept += size
+        if removed:
+            logger.info("Removed %s cached temp files", removed)
+    
+    def _run(self):
+        while True:
+            try:
+                self.prune()
             except Exception as e:
-                print(f"[Photo Message] Error processing image: {e}")
-                print(traceback.format_exc())
-                return None
+                logger.error("Error pruning temp files: %s", e)
+            time.sleep(self.SWEEP_INTERVAL)
+
+temp_artifacts = TempArtifactCache(
+    os.path.join(tempfile.gettempdir(), "photo_message"),
+    max_bytes=lambda: int(get_option("photo_message_temp_max_mb", 512)) * 1024 * 1024,
+    max_age=lambda: float(get_option("photo_message_temp_max_age_hours", 24)) * 3600
+)
+
+def reactor_source_value(photo):
+    """
+    ReActor source image value for a photo, as a file Gradio sends to the
+    browser as-is. Persisted photos use their stored file, photos kept in
+    memory get a cached temp file of their encoded bytes.
+    """
+    path = photo.blob_path
+    if path and os.path.isfile(path) and mimetypes.guess_type(path)[0] == photo.mime_type:
+        return path
+    extension = mimetypes.guess_extension(photo.mime_type) or '.bin'
+    return temp_artifacts.put(photo.image_bytes, extension.lstrip('.'))
+
+def setup_reactor_with_image(image_data):
+    """
+    Enable ReActor and set its source image. Returns (status, [enabled update,
+    source update]), the updates are meant for reactor_components.enabled and
+    reactor_components.source.
+    """
+    no_change = [gr.update(), gr.update()]
+    try:
+        # Selected photo info from the list, use the full-size stored image
+        if isinstance(image_data, dict):
+            photo = photos.get(image_data.get('id'))
+            if photo is None or not photo.has_image:
+                return "Selected photo is no longer available", no_change
+            image_data = reactor_source_value(photo)
+        
+        if isinstance(image_data, str) and not os.path.isfile(image_data):
+            # Base64 string
+            image_data = Image.open(io.BytesIO(decode_image_data(image_data)))
+        elif not isinstance(image_data, (str, Image.Image)):
+            logger.warning("Unsupported image type: %s", type(image_data))
+            return "Could not setup ReActor", no_change
+        
+        if not reactor_components.resolve().available:
+            return "Could not setup ReActor", no_change
+        
+        # Image components accept both PIL images and file paths as values
+        logger.info("Enabled ReActor and set its source image")
+        return "Image set and ReActor activated", [gr.update(value=True), gr.update(value=image_data)]
+        
+    except Exception as e:
+        logger.exception("Error in ReActor setup: %s", e)
+        return "Could not setup ReActor", no_change
+
+def send_image_to_tab(photo_info):
+    """
+    Status for a photo sent to another tab. The browser fetches the stored
+    photo and fills in the tab itself, so no image work happens here.
+    """
+    if not photo_info or not photo_info.get('id'):
+        return "No image selected"
+    if photos.get(photo_info['id']) is None:
+        return "Selected photo is no longer available"
+    return "Image sent"
+
+def hand_off_to_img2img(photo_info):
+    """
+    Python side of "Send to img2img", after the browser has put the photo into
+    img2img: point ReActor at the same photo. Returns (status, [enabled
+    update, source update]), the status reporting how long the hand-off took
+    or why the browser could not put the photo into img2img.
+    """
+    if not photo_info or not photo_info.get('id'):
+        return "No image selected", [gr.update(), gr.update()]
+    
+    timing = photo_info.get('handoff') or {}
+    if timing.get('error'):
+        logger.warning("img2img hand-off failed in the browser: %s", timing['error'])
+        return f"Could not send image to img2img: {timing['error']}", [gr.update(), gr.update()]
+    
+    started = time.perf_counter()
+    status, updates = setup_reactor_with_image(photo_info)
+    server_ms = (time.perf_counter() - started) * 1000
+    
+    browser_ms = timing.get('browser_ms')
+    if browser_ms is not None:
+        status = f"{status} (browser {browser_ms:.0f} ms, server {server_ms:.0f} ms)"
+    else:
+        status = f"{status} (server {server_ms:.0f} ms)"
+    logger.info("img2img hand-off: %s", status)
+    return status, updates
+
+class Rendition:
+    """Encoded image bytes ready to send, with the data URL built at most once"""
+    __slots__ = ('data', 'mime_type', '_data_url')
+    
+    def __init__(self, data, mime_type):
+        self.data = data
+        self.mime_type = mime_type
+        self._data_url = None
+    
+    @property
+    def extension(self):
+        return self.mime_type.split('/')[-1]
+    
+    def data_url(self):
+        if self._data_url is None:
+            self._data_url = f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode()}"
+        return self._data_url
+
+# Payload renditions of recently sent photos and generated images, so a
+# resend or retry reuses the encoded bytes instead of encoding again
+MAX_RENDITIONS = 16
+_renditions = LRUCache(MAX_RENDITIONS)
+
+def encode_jpeg(image, quality=95):
+    buffered = io.BytesIO()
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.save(buffered, format="JPEG", quality=quality)
+    return buffered.getvalue()
+
+def photo_rendition(photo):
+    """Payload rendition of a received photo, its stored bytes are sent as-is"""
+    # Keyed on size too, the ingest pipeline may replace the bytes once
+    key = ('photo', photo.id, photo.size)
+    rendition = _renditions.get(key)
+    if rendition is None:
+        image_bytes = photo.image_bytes
+        if image_bytes is None:
+            return None
+        rendition = Rendition(image_bytes, photo.mime_type)
+        _renditions.put(key, rendition)
+    return rendition
+
+def generated_rendition(generated):
+    """
+    Payload rendition of a generated image, given as an output file path or a
+    PIL image. Files are re-encoded to JPEG once per path and mtime.
+    """
+    if isinstance(generated, Image.Image):
+        return Rendition(encode_jpeg(generated), 'image/jpeg')
+    
+    key = ('file', generated, os.path.getmtime(generated))
+    rendition = _renditions.get(key)
+    if rendition is None:
+        with Image.open(generated) as image:
+            rendition = Rendition(encode_jpeg(image), 'image/jpeg')
+        _renditions.put(key, rendition)
+    return rendition
+
+# How images are sent over HTTP: base64 data URLs inside JSON, or binary
+# multipart attachments for display apps that support them
+DELIVERY_FORMATS = ["base64", "binary"]
+
+class DisplayAppClient:
+    """
+    Keep-alive HTTP client shared by every call to the display app. A single
+    requests.Session with a sized connection pool reuses TCP connections
+    instead of opening a new one per send.
+    """
+    def __init__(self, base_url, pool_size=4, connect_timeout=3.0, read_timeout=10.0):
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            pool_block=True,
+            max_retries=0
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, f"{self.base_url}{path}", **kwargs)
+    
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+    
+    def close(self):
+        self.session.close()
+
+_display_app_client = None
+_display_app_client_lock = threading.Lock()
+
+def display_app_client():
+    """Shared display app client, rebuilt when its settings change"""
+    global _display_app_client
+    pool_size = max(1, int(get_option("photo_message_http_pool_size", 4)))
+    timeout = (float(get_option("photo_message_http_connect_timeout", 3)),
+               float(get_option("photo_message_http_read_timeout", 10)))
+    with _display_app_client_lock:
+        client = _display_app_client
+        if client is None or client.pool_size != pool_size or client.timeout != timeout:
+            if client is not None:
+                client.close()
+            client = DisplayAppClient(DISPLAY_APP_URL, pool_size, *timeout)
+            _display_app_client = client
+        return client
+
+class DeliveryError(Exception):
+    """The display app did not accept a delivery"""
+
+class DisplayAppUnavailable(DeliveryError):
+    """The display app is not connected, the delivery should wait for it"""
+
+def delivery_key(photo):
+    """Idempotency key of a photo's delivery, so the display app can drop repeats"""
+    return f"photo_message-{photo.id}"
+
+def deliver_to_display_app(source_photo, generated_image, acknowledge):
+    """
+    Send a source photo and generated image (output file path or PIL image)
+    to the display app. Returns (transport, confirmed): HTTP deliveries are
+    confirmed by the response, WebSocket deliveries are confirmed later when
+    the display app's ack is passed to acknowledge. Raises DeliveryError if
+    the delivery was not accepted, DisplayAppUnavailable while disconnected.
+    """
+    if not display_app_connection.ready:
+        raise DisplayAppUnavailable("Display app is not connected")
+    
+    try:
+        source = photo_rendition(source_photo)
+        generated = generated_rendition(generated_image)
+    except Exception as e:
+        raise DeliveryError(f"Error formatting images: {e}")
+    if source is None:
+        raise DeliveryError("Source photo has no image data")
+        
+    metadata = {
+        "name": source_photo.name,
+        "message": source_photo.message,
+        "timestamp": source_photo.timestamp,
+        "id": source_photo.id,
+        "idempotency_key": delivery_key(source_photo)
+    }
+    
+    logger.debug("Delivering photo %s: source %s (%s bytes), generated %s (%s bytes)",
+                 source_photo.id, source.mime_type, len(source.data), generated.mime_type, len(generated.data))
+    
+    # Send over the socket when the display app acknowledges deliveries
+    if display_app_capabilities["acks"]:
+        if display_app_capabilities["binary"]:
+            logger.debug("Sending via WebSocket (binary)...")
+            sio.emit('new_photo_binary', {
+                "source_image": source.data,
+                "source_mime_type": source.mime_type,
+                "generated_image": generated.data,
+                "generated_mime_type": generated.mime_type,
+                **metadata
+            }, callback=acknowledge)
+        else:
+            logger.debug("Sending via WebSocket...")
+            sio.emit('new_photo', {
+                "source_image": source.data_url(),
+                "generated_image": generated.data_url(),
+                **metadata
+            }, callback=acknowledge)
+        return "WebSocket", False
+        
+    # Older display apps don't ack socket events, their HTTP endpoint confirms instead
+    logger.debug("Display app does not acknowledge WebSocket deliveries, sending via HTTP...")
+    try:
+        if get_option("photo_message_delivery_format", "base64") == "binary":
+            response = display_app_client().post(
+                "/new_photo",
+                data=metadata,
+                headers={"Idempotency-Key": metadata["idempotency_key"]},
+                files={
+                    "source_image": (f"source.{source.extension}", source.data, source.mime_type),
+                    "generated_image": (f"generated.{generated.extension}", generated.data, generated.mime_type)
+                }
+            )
+        else:
+            response = display_app_client().post(
+                "/new_photo",
+                json={
+                    "source_image": source.data_url(),
+                    "generated_image": generated.data_url(),
+                    **metadata
+                },
+                headers={
+                    "Content-Type": "application/json",
+                    "Idempotency-Key": metadata["idempotency_key"]
+                }
+            )
+    except requests.exceptions.ConnectionError:
+        raise DeliveryError("Could not connect to display app - make sure it's running")
+    except requests.exceptions.Timeout:
+        raise DeliveryError("Display app did not respond in time")
+    
+    if response.status_code != 200:
+        raise DeliveryError(f"Error sending images: {response.status_code} - {response.text}")
+    
+    logger.debug("Successfully sent via HTTP")
+    return "HTTP", True
+
+class DeliveryJob:
+    """One queued delivery of a source photo and generated image"""
+    __slots__ = ('id', 'photo_id', 'generated_image', 'status', 'attempts',
+                 'error', 'transport', 'created_at', 'updated_at')
+    
+    def __init__(self, photo_id, generated_image):
+        self.id = uuid.uuid4().hex
+        self.photo_id = photo_id
+        self.generated_image = generated_image
+        self.status = "queued"
+        self.attempts = 0
+        self.error = None
+        self.transport = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+    
+    @property
+    def finished(self):
+        return self.status in ("delivered", "failed")
+    
+    def info(self):
+        return {
+            'id': self.id,
+            'photo_id': self.photo_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'transport': self.transport,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+    
+    def describe(self):
+        """Status line for the UI"""
+        if self.status == "delivered":
+            return f"Images sent successfully via {self.transport}"
+        if self.status == "failed":
+            return f"Delivery failed after {self.attempts} attempts: {self.error}"
+        if self.status == "retrying":
+            return f"Retrying delivery (attempt {self.attempts} failed: {self.error})"
+        if self.status == "sending":
+            return f"Sending to display app (attempt {self.attempts})..."
+        if self.status == "waiting":
+            return "Waiting for the display app connection, will send when it is back"
+        if self.status == "awaiting_ack":
+            return f"Sent via {self.transport}, waiting for the display app to confirm..."
+        return "Delivery queued"
+
+class DeliveryQueue:
+    """
+    Background delivery to the display app. Jobs are accepted immediately and
+    sent by a small worker pool, so a slow display app never blocks the UI.
+    Failed attempts are retried with exponential backoff, and a photo is only
+    marked as sent once its delivery is confirmed.
+    
+    Sends confirmed by a later ack don't hold a worker: they wait in a
+    pending-ack table (up to max_in_flight at once) while the workers move on
+    to the next job, and fail over to a retry if no ack comes within
+    ack_timeout seconds.
+    
+    While available() reports the display app as down, jobs are held back
+    without using up attempts, and resume() sends them once it is back.
+    """
+    MAX_JOBS = 500
+    SWEEP_INTERVAL = 0.5
+    
+    def __init__(self, registry, deliver, workers=2, max_attempts=5, base_delay=1.0, max_delay=30.0,
+                 ack_timeout=15.0, max_in_flight=16, available=None):
+        self.registry = registry
+        self.deliver = deliver
+        self.available = available
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.ack_timeout = ack_timeout
+        self._queue = queue.Queue()
+        self._jobs = OrderedDict()
+        self._active = {}
+        # job id -> (job, attempt, deadline) of sends not yet confirmed; the
+        # deadline is None while deliver() runs, only unconfirmed sends get one
+        self._pending = {}
+        # Jobs held back until the display app is available
+        self._waiting = []
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._threads = []
+    
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"photo_message_delivery_{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._sweep, name="photo_message_delivery_acks", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def submit(self, photo, generated_image):
+        """Queue a delivery, returning the existing job if the photo is already in flight"""
+        self.start()
+        with self._lock:
+            active_id = self._active.get(photo.id)
+            if active_id is not None:
+                return self._jobs[active_id]
+            job = DeliveryJob(photo.id, generated_image)
+            self._jobs[job.id] = job
+            self._active[photo.id] = job.id
+            self._trim()
+        self._queue.put(job)
+        return job
+    
+    def get(self, job_id):
+        if not job_id:
+            return None
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def _trim(self):
+        # Forget the oldest finished jobs
+        excess = len(self._jobs) - self.MAX_JOBS
+        for job_id in [j.id for j in self._jobs.values() if j.finished][:max(0, excess)]:
+            del self._jobs[job_id]
+    
+    def _set_status(self, job, status, error=None):
+        with self._lock:
+            job.status = status
+            job.error = error
+            job.updated_at = time.time()
+            if job.finished:
+                # The generated image is no longer needed once the job is done
+                job.generated_image = None
+                if self._active.get(job.photo_id) == job.id:
+                    del self._active[job.photo_id]
+    
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+    
+    def waiting_count(self):
+        with self._lock:
+            return len(self._waiting)
+    
+    def resume(self):
+        """Send the jobs held back while the display app was unavailable"""
+        with self._lock:
+            waiting, self._waiting = self._waiting, []
+        for job in waiting:
+            self._queue.put(job)
+        if waiting:
+            logger.info("Resuming %s held deliveries", len(waiting))
+    
+    def _hold(self, job, reason):
+        with self._lock:
+            job.status = "waiting"
+            job.error = reason
+            job.updated_at = time.time()
+            self._waiting.append(job)
+        # The display app may have come back while this job was on its way here
+        if self.available is not None and self.available():
+            self.resume()
+    
+    def connection_lost(self):
+        """Fail every send still waiting for an ack, they will not be confirmed"""
+        with self._lock:
+            pending = [(job, attempt) for job, attempt, deadline in self._pending.values()
+                       if deadline is not None]
+        for job, attempt in pending:
+            if self._resolve(job, attempt):
+                self._failed(job, "Connection to display app lost before confirmation")
+    
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._attempt(job)
+            except Exception as e:
+                logger.exception("Unexpected error in delivery worker: %s", e)
+                self._set_status(job, "failed", str(e))
+    
+    def _sweep(self):
+        while True:
+            time.sleep(self.SWEEP_INTERVAL)
+            now = time.time()
+            with self._lock:
+                expired = [(job, attempt) for job, attempt, deadline in self._pending.values()
+                           if deadline is not None and deadline <= now]
+            for job, attempt in expired:
+                if self._resolve(job, attempt):
+                    self._failed(job, f"No acknowledgement from display app within {self.ack_timeout:g}s")
+    
+    def _resolve(self, job, attempt):
+        """Take an attempt out of the pending-ack table, True if this call did so"""
+        with self._lock:
+            entry = self._pending.get(job.id)
+            if entry is None or entry[1] != attempt:
+                return False
+            del self._pending[job.id]
+        self._in_flight.release()
+        return True
+    
+    def _acknowledged(self, job, attempt, response):
+        """Ack callback of a WebSocket delivery, called from the Socket.IO thread"""
+        resolved = self._resolve(job, attempt)
+        status = response.get("status") if isinstance(response, dict) else response
+        if status in ("ok", "duplicate", True):
+            # Late acks still count, the display app did get the photo
+            if not job.finished:
+                photo = self.registry.get(job.photo_id)
+                if photo is not None:
+                    self._delivered(job, photo)
+            # A retry may be in flight by now, it needs no ack of its own
+            self._resolve(job, job.attempts)
+        elif resolved:
+            error = response.get("error", status) if isinstance(response, dict) else status
+            self._failed(job, f"Display app rejected delivery: {error}")
+    
+    def _attempt(self, job):
+        if job.finished:
+            return
+        photo = self.registry.get(job.photo_id)
+        if photo is None:
+            self._set_status(job, "failed", "Source photo not found in memory")
+            return
+        if photo.is_sent:
+            job.transport = job.transport or "earlier delivery"
+            self._set_status(job, "delivered")
+            return
+        if self.available is not None and not self.available():
+            self._hold(job, "Display app is not connected")
+            return
+        
+        # Wait for room in the pending-ack table, then register the attempt
+        # before sending so an immediate ack always finds it. The ack timeout
+        # only starts once deliver() says the send still needs confirming, so
+        # a slow HTTP post is never timed out and retried while it runs.
+        self._in_flight.acquire()
+        job.attempts += 1
+        attempt = job.attempts
+        with self._lock:
+            self._pending[job.id] = (job, attempt, None)
+        self._set_status(job, "sending")
+        try:
+            job.transport, confirmed = self.deliver(
+                photo, job.generated_image,
+                lambda response=None, *_: self._acknowledged(job, attempt, response)
+            )
+        except DisplayAppUnavailable as e:
+            if self._resolve(job, attempt):
+                # Not the display app's fault, this attempt doesn't count
+                job.attempts -= 1
+                self._hold(job, str(e))
+            return
+        except Exception as e:
+            if self._resolve(job, attempt):
+                if not isinstance(e, DeliveryError):
+                    logger.error("Unexpected error delivering %s", job.id, exc_info=e)
+                self._failed(job, str(e))
+            return
+        
+        if confirmed:
+            if self._resolve(job, attempt):
+                self._delivered(job, photo)
+        else:
+            with self._lock:
+                entry = self._pending.get(job.id)
+                if entry is not None and entry[1] == attempt:
+                    self._pending[job.id] = (job, attempt, time.time() + self.ack_timeout)
+                if job.status == "sending":
+                    job.status = "awaiting_ack"
+                    job.updated_at = time.time()
+    
+    def _failed(self, job, error_msg):
+        if job.finished:
+            return
+        logger.warning("Delivery %s attempt %s failed: %s", job.id, job.attempts, error_msg)
+        if job.attempts >= self.max_attempts:
+            self._set_status(job, "failed", error_msg)
+            return
+        self._set_status(job, "retrying", error_msg)
+        delay = min(self.max_delay, self.base_delay * 2 ** (job.attempts - 1))
+        timer = threading.Timer(delay, self._queue.put, (job,))
+        timer.daemon = True
+        timer.start()
     
-    print(f"[Photo Message] No photo found for timestamp: {timestamp}")
-    return None
+    def _delivered(self, job, photo):
+        # Mark the photo as sent
+        self.registry.mark_sent(photo)
+        self._set_status(job, "delivered")
+        logger.info("Delivery %s confirmed via %s", job.id, job.transport)
 
-def update_photo_list():
-    photo_data = [[p.timestamp, p.name, p.message, "✓" if p.is_sent else ""] for p in photos]
-    print(f"[Photo Message] Updating photo list with {len(photo_data)} photos")
-    # Convert to DataFrame with sent status
-    df = pd.DataFrame(photo_data, columns=["Time", "Name", "Message", "Sent"])
-    return df
+# Seconds to wait for the display app to acknowledge a WebSocket delivery
+DELIVERY_ACK_TIMEOUT = 15
+delivery_queue = DeliveryQueue(photos, deliver_to_display_app, ack_timeout=DELIVERY_ACK_TIMEOUT,
+                               available=lambda: display_app_connection.ready)
+# Sends made while disconnected go out once the connection is back, and acks
+# still outstanding when it drops will never arrive, so those are retried
+display_app_connection.add_listeners(on_ready=delivery_queue.resume, on_lost=delivery_queue.connection_lost)
+DISPLAY_APP_POLL_SECONDS = 2
+DELIVERY_POLL_SECONDS = 1
 
-def on_photo_select(evt: gr.SelectData, current_value):
-    """Handle selection of a photo from the list"""
-    try:
-        print("[Photo Message] Photo selection started")
-        print(f"[Photo Message] Selection event: {evt.index}")
+def send_to_api(source_photo_data, generated_image, generated_path=None):
+    """Queue the selected photo and generated image for delivery, returning (status, job id)"""
+    if source_photo_data is None or generated_image is None:
+        return "Please select both a source photo and a generated image", None
         
-        if current_value is None or len(current_value.index) == 0:
-            print("[Photo Message] No data in DataFrame")
-            return None, None
-            
-        row_idx = evt.index[0]
-        if row_idx >= len(current_value.index):
-            print("[Photo Message] Selected index out of range")
-            return None, None
-            
-        timestamp = current_value.iloc[row_idx, 0]
-        print(f"[Photo Message] Selected timestamp: {timestamp}")
+    try:
+        logger.debug("Queueing images for the display app...")
         
-        # Find the photo in our list
-        for photo in photos:
-            if photo.timestamp == timestamp:
-                print(f"[Photo Message] Found matching photo: {photo.name}")
-                
-                # Create info dict with metadata and sent status
-                photo_info = {
-                    'timestamp': photo.timestamp,
-                    'name': photo.name,
-                    'message': photo.message,
-                    'is_sent': photo.is_sent
-                }
-                
-                # Get the image
-                try:
-                    print("[Photo Message] Processing image data...")
-                    print(f"[Photo Message] Image data length: {len(photo.image_data)}")
-                    
-                    # Handle base64 data
-                    image_data = photo.image_data
-                    if isinstance(image_data, str):
-                        # Remove data URL prefix if present
-                        if 'base64,' in image_data:
-                            print("[Photo Message] Removing data URL prefix")
-                            image_data = image_data.split('base64,')[1]
-                        
-                        # Add padding if needed
-                        padding = len(image_data) % 4
-                        if padding:
-                            print("[Photo Message] Adding base64 padding")
-                            image_data += '=' * (4 - padding)
-                        
-                        try:
-                            # Decode base64
-                            print("[Photo Message] Decoding base64 data")
-                            image_bytes = base64.b64decode(image_data)
-                            print(f"[Photo Message] Decoded bytes length: {len(image_bytes)}")
-                            
-                            # Create PIL Image
-                            print("[Photo Message] Creating PIL Image")
-                            image = Image.open(io.BytesIO(image_bytes))
-                            
-                            # Convert to RGB if needed
-                            if image.mode != 'RGB':
-                                print(f"[Photo Message] Converting from {image.mode} to RGB")
-                                image = image.convert('RGB')
-                            
-                            print("[Photo Message] Successfully created image")
-                            return image, photo_info
-                            
-                        except base64.binascii.Error as be:
-                            print(f"[Photo Message] Base64 decode error: {be}")
-                            print(f"[Photo Message] Base64 string preview: {image_data[:100]}...")
-                            return None, None
-                        except PIL.UnidentifiedImageError as pie:
-                            print(f"[Photo Message] PIL error: {pie}")
-                            print(f"[Photo Message] First few bytes: {image_bytes[:20].hex()}")
-                            return None, None
-                    else:
-                        print(f"[Photo Message] Unsupported image data type: {type(image_data)}")
-                        return None, None
-                        
-                except Exception as e:
-                    print(f"[Photo Message] Error processing image: {e}")
-                    print(traceback.format_exc())
-                    return None, None
-                    
-        print(f"[Photo Message] No matching photo found for timestamp: {timestamp}")
-        return None, None
+        # Get metadata from source photo
+        source_photo = photos.get(source_photo_data.get('id'))
+        if source_photo is None:
+            return "Source photo not found in memory", None
+        if source_photo.is_sent:
+            return "This photo has already been processed", None
         
+        # Prefer the output file, its encoded payload can be cached and reused
+        if generated_path and os.path.isfile(generated_path):
+            generated_image = generated_path
+        job = delivery_queue.submit(source_photo, generated_image)
+        return job.describe(), job.id
+            
     except Exception as e:
-        print(f"[Photo Message] Error in photo selection: {e}")
-        print(traceback.format_exc())
-        return None, None
+        error_msg = f"Error preparing images: {str(e)}"
+        logger.exception("%s", error_msg)
+        return error_msg, None
 
-def setup_reactor_with_image(image_data):
-    """
-    Find ReActor extension, enable it, and set a base64 source image.
-    Returns True if successful, False otherwise.
-    """
-    try:
-        print("[Photo Message] Starting ReActor setup...")
-        print(f"[Photo Message] Input image data type: {type(image_data)}")
+def poll_delivery_status(job_id, last_status):
+    """Report progress of the last queued delivery"""
+    job = delivery_queue.get(job_id)
+    if job is None or (job.status, job.attempts) == tuple(last_status or ()):
+        return gr.update(), last_status
+    # The photo table picks up the sent flag through the registry version
+    return job.describe(), [job.status, job.attempts]
 
-        # Convert input to base64 data URL format
-        try:
-            if isinstance(image_data, Image.Image):
-                # Convert PIL Image to base64
-                buffered = io.BytesIO()
-                if image_data.mode != 'RGB':
-                    image_data = image_data.convert('RGB')
-                image_data.save(buffered, format="JPEG", quality=95)
-                img_str = base64.b64encode(buffered.getvalue()).decode()
-                img_data = f'data:image/jpeg;base64,{img_str}'
-                print("[Photo Message] Converted PIL Image to base64")
-            elif isinstance(image_data, str):
-                if os.path.isfile(image_data):
-                    # Load file and convert to base64
-                    with open(image_data, 'rb') as img_file:
-                        img_str = base64.b64encode(img_file.read()).decode()
-                        img_data = f'data:image/jpeg;base64,{img_str}'
-                    print("[Photo Message] Loaded image from file and converted to base64")
-                else:
-                    # Handle base64 string - ensure it has the data URL prefix
-                    img_data = image_data
-                    if not img_data.startswith('data:'):
-                        img_data = f'data:image/jpeg;base64,{img_data}'
-                    print("[Photo Message] Using provided base64 string")
-            else:
-                print(f"[Photo Message] Unsupported image type: {type(image_data)}")
-                return False
+def poll_display_app_status(last_version):
+    """Connection status line, only re-rendered when the connection state changed"""
+    version = display_app_connection.version
+    if version == last_version:
+        return gr.update(), last_version
+    return display_app_connection.describe(), version
 
-            # Find ReActor in loaded scripts
-            reactor_script = None
-            print("[Photo Message] Searching for ReActor script...")
-            print(f"[Photo Message] Number of loaded scripts: {len(scripts.scripts_data)}")
-            
-            for script in scripts.scripts_data:
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+OUTPUT_DIR_OPTIONS = ('outdir_samples', 'outdir_txt2img_samples', 'outdir_img2img_samples', 'outdir_extras_samples')
+
+def get_output_dirs():
+    """A1111 output directories to look for generated images in"""
+    dirs = []
+    for option in OUTPUT_DIR_OPTIONS:
+        dir_path = getattr(shared.opts, option, None)
+        if dir_path:
+            dir_path = os.path.abspath(dir_path)
+            if dir_path not in dirs:
+                dirs.append(dir_path)
+    return dirs
+
+class OutputIndex:
+    """
+    Incremental index of the image files under the output directories.
+    Each directory remembers its mtime, image files and subdirectories; a
+    directory is only listed again when its mtime changed, so a rescan costs
+    one stat per directory plus work proportional to the new files.
+    """
+    # A directory modified this recently may still gain entries within the
+    # same mtime tick, so it is listed again on the next scan
+    SETTLE_SECONDS = 2
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirs = {}
+        self.files = {}
+    
+    def scan(self, roots):
+        """Bring the index up to date, returning the (path, mtime) of files added since the last scan"""
+        with self._lock:
+            added = []
+            seen = set()
+            stack = [root for root in roots if root]
+            while stack:
+                dir_path = stack.pop()
+                if dir_path in seen:
+                    continue
+                seen.add(dir_path)
                 try:
-                    if hasattr(script, 'script_class'):
-                        module_name = script.script_class.__module__.lower()
-                        class_name = script.script_class.__name__.lower()
-                        print(f"[Photo Message] Checking script - Module: {module_name}, Class: {class_name}")
-                        
-                        # Look for reactor_faceswap in the module name
-                        if 'reactor_faceswap' in module_name:
-                            reactor_script = script
-                            print(f"[Photo Message] Found ReActor script: {script.script_class.__module__}.{script.script_class.__name__}")
-                            break
-                except Exception as e:
-                    print(f"[Photo Message] Error checking script: {e}")
+                    dir_mtime = os.stat(dir_path).st_mtime_ns
+                except OSError:
+                    continue
+                
+                cached = self._dirs.get(dir_path)
+                if cached is not None and cached[0] == dir_mtime:
+                    stack.extend(cached[2])
+                    continue
+                
+                files = {}
+                subdirs = []
+                try:
+                    with os.scandir(dir_path) as entries:
+                        for entry in entries:
+                            try:
+                                if entry.is_dir(follow_symlinks=False):
+                                    subdirs.append(entry.path)
+                                elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                                    if cached is not None and entry.path in cached[1]:
+                                        files[entry.path] = cached[1][entry.path]
+                                    else:
+                                        files[entry.path] = entry.stat().st_mtime
+                            except OSError as e:
+                                logger.error("Error getting file info for %s: %s", entry.path, e)
+                except OSError as e:
+                    logger.error("Error scanning directory %s: %s", dir_path, e)
                     continue
+                
+                self._forget_files(cached, files)
+                for path, mtime in files.items():
+                    if path not in self.files:
+                        added.append((path, mtime))
+                    self.files[path] = mtime
+                
+                settled = time.time() - dir_mtime / 1e9 > self.SETTLE_SECONDS
+                self._dirs[dir_path] = (dir_mtime if settled else None, files, subdirs)
+                stack.extend(subdirs)
             
-            if not reactor_script:
-                print("[Photo Message] ReActor extension not found. Available scripts:")
-                for script in scripts.scripts_data:
-                    try:
-                        if hasattr(script, 'script_class'):
-                            print(f"- {script.script_class.__module__}.{script.script_class.__name__}")
-                    except:
-                        print("- [Error getting script info]")
-                return False
+            # Directories that disappeared or are no longer configured
+            for dir_path in set(self._dirs) - seen:
+                self._forget_files(self._dirs.pop(dir_path), {})
+            
+            return added
+    
+    def _forget_files(self, cached, keep):
+        if cached is None:
+            return
+        for path in cached[1]:
+            if path not in keep:
+                self.files.pop(path, None)
+    
+    def newest(self, count=None, max_age=None):
+        """
+        (path, mtime) of the newest indexed files, newest first, optionally
+        limited to files newer than max_age seconds. With a count the top-k
+        comes from a bounded heap instead of sorting the whole index.
+        """
+        cutoff = time.time() - max_age if max_age else 0
+        with self._lock:
+            candidates = [(path, mtime) for path, mtime in self.files.items() if mtime >= cutoff]
+        if count is None:
+            candidates.sort(key=operator.itemgetter(1), reverse=True)
+            return candidates
+        return heapq.nlargest(count, candidates, key=operator.itemgetter(1))
 
-            # Find and update ReActor's components
-            reactor_found = False
-            reactor_source = None
-            reactor_checkbox = None
+# Shared index of the output directories used by the Generated Images gallery
+output_index = OutputIndex()
 
-            # Get all components from the ReActor script
-            print("[Photo Message] Searching for ReActor components...")
-            try:
-                # Get the script's UI elements by calling the ui function
-                if hasattr(reactor_script, 'script_class') and hasattr(reactor_script.script_class, 'ui'):
-                    print("[Photo Message] Getting UI elements...")
-                    # Create an instance of the script class
-                    script_instance = reactor_script.script_class()
-                    # Call the ui function to get the elements
-                    ui_elements = script_instance.ui()
-                    if isinstance(ui_elements, (list, tuple)):
-                        print(f"[Photo Message] Found {len(ui_elements)} UI elements")
-                        
-                        # Look for the checkbox and source image components
-                        for elem in ui_elements:
-                            try:
-                                elem_id = str(getattr(elem, 'elem_id', ''))
-                                print(f"[Photo Message] Checking element: {elem_id}")
-                                
-                                if 'reactor_enabled' in elem_id.lower():
-                                    reactor_checkbox = elem
-                                    print(f"[Photo Message] Found ReActor checkbox: {elem_id}")
-                                    reactor_found = True
-                                elif 'reactor_source' in elem_id.lower() and isinstance(elem, gr.Image):
-                                    reactor_source = elem
-                                    print(f"[Photo Message] Found ReActor source image: {elem_id}")
-                            except Exception as e:
-                                print(f"[Photo Message] Error checking element: {e}")
-                                continue
-                    else:
-                        print(f"[Photo Message] UI elements not in expected format: {type(ui_elements)}")
-                else:
-                    print("[Photo Message] Script has no UI function")
-            except Exception as e:
-                print(f"[Photo Message] Error accessing script UI: {e}")
-                print(traceback.format_exc())
+# Optional: inotify/FSEvents/ReadDirectoryChangesW based watching when
+# watchdog is installed, otherwise the output index is polled
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
 
-            if not reactor_found:
-                print("[Photo Message] Could not find ReActor's components")
+class RecentGenerations:
+    """
+    Time-ordered ring of the most recent generated image files. New files
+    are almost always the newest, which makes an insert an O(1) append;
+    the version counter lets the gallery skip refreshes when nothing changed.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.version = 0
+        self._items = deque()
+        self._paths = set()
+        self._lock = threading.Lock()
+    
+    def add(self, path, mtime):
+        with self._lock:
+            if path in self._paths:
+                return False
+            if len(self._items) >= self.capacity and mtime <= self._items[0][0]:
                 return False
+            if not self._items or mtime >= self._items[-1][0]:
+                self._items.append((mtime, path))
+            else:
+                self._items.insert(bisect.bisect_right(self._items, (mtime, path)), (mtime, path))
+            self._paths.add(path)
+            while len(self._items) > self.capacity:
+                self._paths.discard(self._items.popleft()[1])
+            self.version += 1
+            return True
+    
+    def newest(self, max_age=None, limit=None):
+        """(path, mtime) of files still on disk, newest first"""
+        cutoff = time.time() - max_age if max_age else 0
+        result = []
+        with self._lock:
+            items = list(reversed(self._items))
+        for mtime, path in items:
+            if mtime < cutoff or (limit and len(result) >= limit):
+                break
+            if os.path.exists(path):
+                result.append((path, mtime))
+        return result
 
-            # Enable ReActor if checkbox found
-            if reactor_checkbox and hasattr(reactor_checkbox, 'update'):
-                try:
-                    reactor_checkbox.update(value=True)
-                    print("[Photo Message] Enabled ReActor checkbox")
-                except Exception as e:
-                    print(f"[Photo Message] Error enabling ReActor: {str(e)}")
-                    print(traceback.format_exc())
+class _OutputEventHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+    
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+    
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.dest_path)
 
-            # Set source image if component found
-            if reactor_source and hasattr(reactor_source, 'update'):
-                try:
-                    # Create temporary file
-                    temp_dir = os.path.join(tempfile.gettempdir(), "photo_message")
-                    os.makedirs(temp_dir, exist_ok=True)
-                    temp_path = os.path.join(temp_dir, f"reactor_source_{int(time.time())}.jpg")
-                    
-                    # Convert base64 to file
-                    if img_data.startswith('data:'):
-                        img_data = img_data.split('base64,')[1]
-                    
-                    # Decode and save as file
-                    img_bytes = base64.b64decode(img_data)
-                    with open(temp_path, 'wb') as f:
-                        f.write(img_bytes)
-                    
-                    # Update using file path
-                    reactor_source.update(value=temp_path)
-                    print("[Photo Message] Successfully updated ReActor source image")
-                    return True
-                except Exception as e:
-                    print(f"[Photo Message] Error updating ReActor source: {str(e)}")
-                    print(traceback.format_exc())
-                    return False
+class OutputWatcher:
+    """
+    Background feed of new generations into a RecentGenerations ring. Uses
+    watchdog when available and otherwise polls the incremental output
+    index; A1111's image-saved callback feeds it directly as well.
+    """
+    POLL_INTERVAL = 2
+    # With watchdog active the poll only catches directories created later
+    WATCHED_POLL_INTERVAL = 30
+    
+    def __init__(self, index, ring):
+        self.index = index
+        self.ring = ring
+        self._observer = None
+        self._watched = set()
+        # poll() also runs on Gradio threads for a manual rescan
+        self._watch_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+    
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="photo_message_output_watcher", daemon=True)
+        self._thread.start()
+        logger.info("Output watcher started (%s)", 'watchdog' if Observer else 'polling')
+    
+    def stop(self):
+        self._stop.set()
+        with self._watch_lock:
+            if self._observer is not None:
+                self._observer.stop()
+                self._observer = None
+                self._watched.clear()
+    
+    def notify(self, path):
+        """Record a newly written output file"""
+        if not path.lower().endswith(IMAGE_EXTENSIONS):
+            return
+        path = os.path.abspath(path)
+        try:
+            self.ring.add(path, os.path.getmtime(path))
+        except OSError:
+            pass
+    
+    def poll(self):
+        """Scan the output directories once and feed new files into the ring"""
+        dirs = get_output_dirs()
+        self._watch(dirs)
+        added = self.index.scan(dirs)
+        for path, mtime in sorted(added, key=lambda x: x[1]):
+            self.ring.add(path, mtime)
+        return len(added)
+    
+    def _watch(self, dirs):
+        if Observer is None:
+            return
+        with self._watch_lock:
+            if self._observer is None:
+                self._observer = Observer()
+                self._observer.daemon = True
+                self._observer.start()
+            for dir_path in dirs:
+                if dir_path not in self._watched and os.path.isdir(dir_path):
+                    self._observer.schedule(_OutputEventHandler(self), dir_path, recursive=True)
+                    self._watched.add(dir_path)
+    
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.exception("Error watching output directories: %s", e)
+            self._stop.wait(self.WATCHED_POLL_INTERVAL if self._watched else self.POLL_INTERVAL)
 
-            print("[Photo Message] Could not update ReActor components")
-            return False
+RECENT_GENERATIONS_SIZE = 200
+GALLERY_POLL_SECONDS = 2
+recent_generations = RecentGenerations(RECENT_GENERATIONS_SIZE)
+output_watcher = OutputWatcher(output_index, recent_generations)
 
-        except Exception as e:
-            print(f"[Photo Message] Error in image processing: {str(e)}")
-            print(traceback.format_exc())
-            return False
+# Small renditions of generated images for the gallery, cached on disk and
+# keyed by path and mtime so a regenerated file gets a fresh thumbnail
+THUMBNAIL_DIR = os.path.join(EXTENSION_DIR, "cache", "thumbnails")
+THUMBNAIL_SIZE = 256
+MAX_THUMBNAILS = 2000
+# Set when a thumbnail is written, so the cache is only scanned after it grew
+_thumbnails_written = threading.Event()
 
-    except Exception as e:
-        print(f"[Photo Message] Error in ReActor setup: {str(e)}")
-        print(traceback.format_exc())
-        return False
+def get_thumbnail(path, mtime):
+    """Path of the cached thumbnail for an image file, creating it if needed"""
+    key = hashlib.sha1(f"{path}|{mtime}".encode()).hexdigest()
+    thumb_path = os.path.join(THUMBNAIL_DIR, f"{key}.jpg")
+    if os.path.exists(thumb_path):
+        return thumb_path
+    
+    os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+    with Image.open(path) as opened:
+        opened.draft('RGB', (THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        thumb = opened.convert('RGB')
+    thumb.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.LANCZOS)
+    tmp_path = f"{thumb_path}.{uuid.uuid4().hex}.tmp"
+    thumb.save(tmp_path, format="JPEG", quality=85)
+    os.replace(tmp_path, thumb_path)
+    _thumbnails_written.set()
+    return thumb_path
 
-def send_image_to_tab(image):
-    """Handle sending an image to another tab"""
+def prune_thumbnails(max_files=MAX_THUMBNAILS):
+    """Drop the oldest cached thumbnails once the cache grows past max_files"""
+    if not _thumbnails_written.is_set():
+        return
+    _thumbnails_written.clear()
     try:
-        if image is None:
-            print("[Photo Message] No image provided")
-            return "No image selected"
+        entries = [e for e in os.scandir(THUMBNAIL_DIR) if e.is_file()]
+    except FileNotFoundError:
+        return
+    if len(entries) <= max_files:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for entry in entries[:len(entries) - max_files]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
 
-        print("[Photo Message] Processing image...")
-        print(f"[Photo Message] Input type: {type(image)}")
+try:
+    from modules.infotext_utils import parse_generation_parameters
+except ImportError:
+    try:
+        from modules.generation_parameters_copypaste import parse_generation_parameters
+    except ImportError:
+        parse_generation_parameters = None
 
-        # Convert to PIL Image if needed
+def read_generation_info(path):
+    """Read and parse the generation parameters stored in an output image"""
+    from modules import images
+    
+    with Image.open(path) as img:
+        geninfo, _ = images.read_info_from_image(img)
+    geninfo = geninfo or ''
+    params = {}
+    if geninfo and parse_generation_parameters is not None:
         try:
-            if isinstance(image, str):
-                # If it's a file path
-                if os.path.isfile(image):
-                    pil_image = Image.open(image)
-                else:
-                    # Handle base64 string
-                    if image.startswith('data:'):
-                        image = image.split('base64,')[1]
-                    # Add padding if needed
-                    padding = len(image) % 4
-                    if padding:
-                        image += '=' * (4 - padding)
-                    # Convert to PIL Image
-                    image_bytes = base64.b64decode(image)
-                    pil_image = Image.open(io.BytesIO(image_bytes))
-            elif isinstance(image, Image.Image):
-                pil_image = image
-            else:
-                print(f"[Photo Message] Unsupported image type: {type(image)}")
-                return "Unsupported image type"
+            params = parse_generation_parameters(geninfo)
+        except Exception as e:
+            logger.warning("Could not parse generation info for %s: %s", path, e)
+    return {
+        'prompt': str(params.get('Prompt', geninfo.split('\n', 1)[0] if geninfo else '')),
+        'negative_prompt': str(params.get('Negative prompt', '')),
+        'seed': str(params.get('Seed', '')),
+        'steps': str(params.get('Steps', '')),
+        'sampler': str(params.get('Sampler', '')),
+        'cfg_scale': str(params.get('CFG scale', '')),
+        'model': str(params.get('Model', '')),
+        'raw': geninfo
+    }
 
-            # Ensure RGB mode
-            if pil_image.mode != 'RGB':
-                pil_image = pil_image.convert('RGB')
+class GenerationInfoCache:
+    """
+    Parsed generation parameters of output images, keyed by path, mtime and
+    size so an image's PNG text chunks are only read and parsed once.
+    """
+    def __init__(self, max_items):
+        self._cache = LRUCache(max_items)
+    
+    def get(self, path):
+        st = os.stat(path)
+        key = (path, st.st_mtime, st.st_size)
+        info = self._cache.get(key)
+        if info is None:
+            info = read_generation_info(path)
+            self._cache.put(key, info)
+        return info
 
-            # Save to temporary file
-            temp_dir = os.path.join(tempfile.gettempdir(), "photo_message")
-            os.makedirs(temp_dir, exist_ok=True)
-            temp_path = os.path.join(temp_dir, f"img2img_source_{int(time.time())}.png")
-            
-            # Save with maximum compatibility
-            pil_image.save(temp_path, format="PNG", optimize=True)
-            print(f"[Photo Message] Saved to temp file: {temp_path}")
+generation_info_cache = GenerationInfoCache(5000)
 
-            # Try to setup ReActor with the file path
-            if setup_reactor_with_image(temp_path):
-                return "Image set and ReActor activated"
-            else:
-                return "Could not setup ReActor"
+# Prompt/seed filters only search this many of the newest images, which stay
+# within generation_info_cache so repeated polls don't re-read any files
+MAX_FILTERED_GENERATIONS = 2000
 
-        except Exception as e:
-            error_msg = f"Error processing image: {str(e)}"
-            print(f"[Photo Message] {error_msg}")
-            print(traceback.format_exc())
-            return error_msg
+def generation_caption(info):
+    """Short gallery caption for an image's generation info"""
+    parts = []
+    if info['seed']:
+        parts.append(f"Seed {info['seed']}")
+    if info['prompt']:
+        prompt = info['prompt']
+        parts.append(prompt if len(prompt) <= 60 else prompt[:57] + "...")
+    return " · ".join(parts) or None
 
-    except Exception as e:
-        error_msg = f"Error in send_image_to_tab: {str(e)}"
-        print(f"[Photo Message] {error_msg}")
-        print(traceback.format_exc())
-        return error_msg
+def matches_generation_filter(info, query):
+    """Case-insensitive match on prompt, exact match on seed"""
+    query = query.strip().lower()
+    return query == info['seed'] or query in info['prompt'].lower()
 
-def format_base64_image(img_data):
-    """Ensure image data has the correct base64 prefix"""
-    try:
-        if isinstance(img_data, str):
-            # If it's already a string (base64)
-            # First remove any existing prefix
-            if 'base64,' in img_data:
-                img_data = img_data.split('base64,')[1]
-            return f"data:image/jpeg;base64,{img_data}"
-        else:
-            # If it's a PIL Image
-            buffered = io.BytesIO()
-            if img_data.mode != 'RGB':
-                img_data = img_data.convert('RGB')
-            img_data.save(buffered, format="JPEG", quality=95)
-            img_str = base64.b64encode(buffered.getvalue()).decode()
-            return f"data:image/jpeg;base64,{img_str}"
-    except Exception as e:
-        print(f"Error formatting base64 image: {e}")
-        print(traceback.format_exc())
-        return None
+def newest_generations(count, max_age):
+    """Newest output files; the recent ring is already sorted, deeper reads use the index"""
+    if count is not None and count <= recent_generations.capacity:
+        return recent_generations.newest(max_age=max_age, limit=count)
+    return output_index.newest(count, max_age)
 
-def send_to_api(source_photo_data, generated_image):
-    if source_photo_data is None or generated_image is None:
-        return "Please select both a source photo and a generated image"
-        
-    try:
-        print("[Photo Message] Sending images to API...")
-        
-        # Get metadata from source photo
-        source_photo = None
-        for photo in photos:
-            if photo.timestamp == source_photo_data['timestamp']:
-                source_photo = photo
-                if photo.is_sent:
-                    return "This photo has already been processed"
+def get_recent_generations(page=1, page_size=20, max_age=3600, query=""):
+    """
+    One page of the newest generated images, optionally filtered by prompt
+    or seed. Returns ([(path, mtime), ...], has_more). Only the top
+    page * page_size entries are ever selected, never the full history;
+    a filter searches at most the newest MAX_FILTERED_GENERATIONS images.
+    """
+    page = max(1, int(page or 1))
+    page_size = max(1, int(page_size or 20))
+    start = (page - 1) * page_size
+    # One extra entry tells whether there is a next page
+    needed = start + page_size + 1
+    
+    if query and query.strip():
+        candidates = []
+        for path, mtime in newest_generations(MAX_FILTERED_GENERATIONS, max_age):
+            try:
+                if matches_generation_filter(generation_info_cache.get(path), query):
+                    candidates.append((path, mtime))
+            except Exception as e:
+                logger.warning("Could not read image info for %s: %s", path, e)
+            if len(candidates) >= needed:
                 break
-                
-        if source_photo is None:
-            return "Source photo not found in memory"
-            
-        # Format both images consistently
-        source_img = format_base64_image(source_photo.image_data)
-        generated_img = format_base64_image(generated_image)
-        
-        if not source_img or not generated_img:
-            return "Error formatting images"
-            
-        payload = {
-            "source_image": source_img,
-            "generated_image": generated_img,
-            "name": source_photo.name,
-            "message": source_photo.message,
-            "timestamp": source_photo.timestamp
-        }
-        
-        print("[Photo Message] Payload preview:")
-        print(f"- Name: {payload['name']}")
-        print(f"- Message: {payload['message']}")
-        print(f"- Timestamp: {payload['timestamp']}")
-        print(f"- Source image prefix: {source_img[:50]}")
-        print(f"- Generated image prefix: {generated_img[:50]}")
-        
-        try:
-            # First try WebSocket if available
-            if hasattr(sio, 'connected') and sio.connected:
-                print("[Photo Message] Sending via WebSocket...")
-                sio.emit('new_photo', payload)
-                
-                # Mark the photo as sent
-                source_photo.is_sent = True
-                update_photo_list()  # Update UI immediately
-                
-                print("[Photo Message] Successfully sent via WebSocket")
-                return "Images sent successfully via WebSocket"
-                
-            # Fallback to HTTP endpoint
-            print("[Photo Message] WebSocket not available, sending via HTTP...")
-            response = requests.post(
-                "http://localhost:5001/new_photo",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                # Mark the photo as sent
-                source_photo.is_sent = True
-                update_photo_list()  # Update UI immediately
-                
-                print("[Photo Message] Successfully sent via HTTP")
-                return "Images sent successfully via HTTP"
-            else:
-                error_msg = f"Error sending images: {response.status_code} - {response.text}"
-                print(f"[Photo Message] {error_msg}")
-                return error_msg
-                
-        except requests.exceptions.ConnectionError:
-            error_msg = "Could not connect to display app - make sure it's running"
-            print(f"[Photo Message] {error_msg}")
-            return error_msg
-        except Exception as e:
-            error_msg = f"Error sending to display app: {str(e)}"
-            print(f"[Photo Message] {error_msg}")
-            print(traceback.format_exc())
-            return error_msg
-            
+    else:
+        candidates = newest_generations(needed, max_age)
+    
+    return candidates[start:start + page_size], len(candidates) > start + page_size
+
+def on_image_saved(params):
+    """A1111 callback, show new generations as soon as they are written"""
+    try:
+        if params.filename:
+            output_watcher.notify(params.filename)
     except Exception as e:
-        error_msg = f"Error preparing images: {str(e)}"
-        print(f"[Photo Message] {error_msg}")
-        print(traceback.format_exc())
-        return error_msg
+        logger.error("Error recording saved image: %s", e)
 
 def on_ui_tabs():
     """Register UI components"""
     try:
-        print("\n[Photo Message] Creating UI tab...")
+        logger.debug("Creating UI tab...")
         
         # Import required modules
         from modules import shared, scripts, script_callbacks, ui, images
@@ -877,6 +3036,11 @@ def on_ui_tabs():
         with gr.Blocks(analytics_enabled=False) as photo_message_tab:
             with gr.Row(equal_height=True):
                 gr.Markdown("## 📸 Photo Message Extension")
+                display_app_status = gr.Markdown(
+                    display_app_connection.describe(),
+                    elem_id="photo_message_display_app_status"
+                )
+                display_app_version = gr.State(-1)
             
             # Main content area
             with gr.Row(variant="panel"):
@@ -884,21 +3048,32 @@ def on_ui_tabs():
                 with gr.Column(scale=2, variant="panel"):
                     gr.Markdown("### 📥 Received Photos")
                     with gr.Row():
-                        # Initialize with DataFrame including sent status
-                        initial_df = pd.DataFrame(
-                            [[p.timestamp, p.name, p.message, "✓" if p.is_sent else ""] for p in photos],
-                            columns=["Time", "Name", "Message", "Sent"]
+                        photo_filter_name = gr.Textbox(
+                            label="Filter by name",
+                            placeholder="Press Enter to apply",
+                            show_label=False
                         )
+                        photo_filter_sent = gr.Radio(PHOTO_SENT_FILTERS, value="All", show_label=False)
+                        photo_filter_within = gr.Number(label="Received within minutes (0 = all)", value=0, precision=0)
+                    with gr.Row():
+                        # Only the first page is rendered here, later pages are
+                        # fetched on demand
+                        initial_df, initial_page_info, _ = update_photo_list()
                         photo_list = gr.Dataframe(
-                            headers=["Time", "Name", "Message", "Sent"],
+                            headers=PHOTO_LIST_COLUMNS,
                             row_count=8,
-                            col_count=(4, "fixed"),
+                            col_count=(len(PHOTO_LIST_COLUMNS), "fixed"),
                             interactive=True,
                             elem_id="photo_list",
                             value=initial_df
                         )
                     with gr.Row():
+                        photo_prev_btn = gr.Button("◀", size="sm", variant="secondary")
+                        photo_page = gr.Number(value=1, label="Page", precision=0)
+                        photo_next_btn = gr.Button("▶", size="sm", variant="secondary")
                         refresh_btn = gr.Button("🔄 Refresh List", size="sm", variant="secondary")
+                    photo_page_info = gr.Markdown(initial_page_info)
+                    photo_list_version = gr.State(None)
                     
                     # Preview area for selected photo
                     with gr.Column():
@@ -924,6 +3099,11 @@ def on_ui_tabs():
                     with gr.Row():
                         gr.Markdown("### 🎨 Generated Images")
                         refresh_generated_btn = gr.Button("🔄 Refresh", size="sm", variant="secondary")
+                    generated_filter = gr.Textbox(
+                        label="Filter by prompt or seed",
+                        placeholder="Press Enter to apply",
+                        show_label=False
+                    )
                     
                     generated_gallery = gr.Gallery(
                         label="Recent Generations",
@@ -933,6 +3113,22 @@ def on_ui_tabs():
                         height=300,
                         preview=True
                     )
+                    with gr.Row():
+                        generated_prev_btn = gr.Button("◀", size="sm", variant="secondary")
+                        generated_page = gr.Number(value=1, label="Page", precision=0)
+                        generated_next_btn = gr.Button("▶", size="sm", variant="secondary")
+                        generated_page_size = gr.Slider(
+                            minimum=4, maximum=100, step=4, label="Images per page",
+                            value=int(get_option("photo_message_gallery_page_size", 20))
+                        )
+                        generated_max_age = gr.Number(
+                            label="Max age in minutes (0 = all)", precision=0,
+                            value=int(get_option("photo_message_gallery_max_age_minutes", 60))
+                        )
+                    generated_page_info = gr.Markdown("")
+                    generated_version = gr.State(-1)
+                    # Full-size file behind each gallery thumbnail
+                    generated_paths = gr.State([])
                     
                     with gr.Column():
                         selected_generated_image = gr.Image(
@@ -943,6 +3139,7 @@ def on_ui_tabs():
                             elem_id="selected_generated_image",
                             height=200
                         )
+                        selected_generated_path = gr.State(None)
                         with gr.Row():
                             send_selected_btn = gr.Button(
                                 "📤 Send to Display App",
@@ -955,6 +3152,8 @@ def on_ui_tabs():
                             interactive=False,
                             visible=True
                         )
+                        delivery_job_id = gr.State(None)
+                        delivery_last_status = gr.State([])
             
             # Help text at the bottom
             with gr.Row(variant="panel"):
@@ -965,98 +3164,76 @@ def on_ui_tabs():
                 - Click on any image to select it for preview and sharing
                 """)
             
-            def get_generated_images():
-                """Get all generated images from output directories"""
+            def get_generated_images(rescan=True, query="", page=1, page_size=20, max_age_minutes=60):
+                """Get a page of recent generated images from output directories, optionally filtered by prompt or seed"""
                 try:
-                    print("[Photo Message] Getting generated images...")
-                    image_paths = []
-                    
-                    # Get paths from various output directories
-                    dirs_to_check = []
-                    
-                    # Get output directories from shared options
-                    if hasattr(shared.opts, 'outdir_samples'):
-                        dirs_to_check.append(shared.opts.outdir_samples)
-                    if hasattr(shared.opts, 'outdir_txt2img_samples'):
-                        dirs_to_check.append(shared.opts.outdir_txt2img_samples)
-                    if hasattr(shared.opts, 'outdir_img2img_samples'):
-                        dirs_to_check.append(shared.opts.outdir_img2img_samples)
-                    if hasattr(shared.opts, 'outdir_extras_samples'):
-                        dirs_to_check.append(shared.opts.outdir_extras_samples)
+                    logger.debug("Getting generated images...")
                     
-                    print(f"[Photo Message] Checking directories: {dirs_to_check}")
+                    # The watcher keeps the ring current, an explicit refresh
+                    # also picks up anything written since its last poll
+                    if rescan:
+                        added = output_watcher.poll()
+                        logger.debug("Found %s new output files", added)
                     
-                    # Keep track of processed files to avoid duplicates
-                    processed_files = set()
-                    
-                    for dir_path in dirs_to_check:
-                        if dir_path and os.path.exists(dir_path):
-                            print(f"[Photo Message] Scanning directory: {dir_path}")
-                            
-                            # Get all image files in directory and subdirectories
-                            for root, _, files in os.walk(dir_path):
-                                for filename in files:
-                                    if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
-                                        full_path = os.path.join(root, filename)
-                                        
-                                        # Skip if we've already processed this file
-                                        if full_path in processed_files:
-                                            continue
-                                            
-                                        try:
-                                            # Get file modification time
-                                            mtime = os.path.getmtime(full_path)
-                                            
-                                            # Only include files from the last hour
-                                            if time.time() - mtime <= 3600:  # 3600 seconds = 1 hour
-                                                image_paths.append((full_path, mtime))
-                                                processed_files.add(full_path)
-                                        except Exception as e:
-                                            print(f"[Photo Message] Error getting file info for {full_path}: {e}")
+                    image_paths, has_more = get_recent_generations(
+                        page, page_size, float(max_age_minutes or 0) * 60, query
+                    )
+                    page_info = f"Page {max(1, int(page or 1))}" + (" · more available" if has_more else "")
                     
                     if not image_paths:
-                        print("[Photo Message] No recent generated images found")
-                        return []
+                        logger.debug("No recent generated images found")
+                        return [], [], page_info
                         
-                    # Sort by modification time (newest first)
-                    image_paths.sort(key=lambda x: x[1], reverse=True)
-                    
-                    # Load images
-                    loaded_images = []
-                    for path, _ in image_paths[:20]:  # Limit to 20 most recent images
+                    # The gallery only gets thumbnails, the full-size file is
+                    # loaded when an image is selected
+                    thumbnails = []
+                    full_paths = []
+                    for path, mtime in image_paths:
                         try:
-                            # Try to read generation parameters from the image
-                            img = Image.open(path)
+                            thumb_path = get_thumbnail(path, mtime)
                             
                             # Try to get generation info
+                            caption = None
                             try:
-                                geninfo = ''
-                                if hasattr(images, 'read_info_from_image'):
-                                    geninfo, _ = images.read_info_from_image(img)
-                                print(f"[Photo Message] Image info for {path}: {geninfo[:100]}...")
+                                caption = generation_caption(generation_info_cache.get(path))
                             except Exception as e:
-                                print(f"[Photo Message] Could not read image info: {e}")
+                                logger.warning("Could not read image info: %s", e)
                             
-                            loaded_images.append(img)
-                            print(f"[Photo Message] Loaded image: {path}")
+                            thumbnails.append((thumb_path, caption))
+                            full_paths.append(path)
                         except Exception as e:
-                            print(f"[Photo Message] Error loading image {path}: {e}")
+                            logger.error("Error loading image %s: %s", path, e)
                             continue
                     
-                    print(f"[Photo Message] Successfully loaded {len(loaded_images)} images")
-                    return loaded_images
+                    prune_thumbnails()
+                    logger.debug("Successfully loaded %s thumbnails", len(thumbnails))
+                    return thumbnails, full_paths, page_info
                     
                 except Exception as e:
-                    print(f"[Photo Message] Error getting generated images: {e}")
-                    print(traceback.format_exc())
-                    return []
+                    logger.exception("Error getting generated images: %s", e)
+                    return [], [], ""
+            
+            def refresh_generated_images(query, page, page_size, max_age_minutes):
+                version = recent_generations.version
+                thumbnails, full_paths, page_info = get_generated_images(
+                    query=query, page=page, page_size=page_size, max_age_minutes=max_age_minutes
+                )
+                return thumbnails, full_paths, page_info, version
+            
+            def poll_generated_images(last_version, query, page, page_size, max_age_minutes):
+                """Refresh the gallery from the ring only when it changed"""
+                version = recent_generations.version
+                if version == last_version:
+                    return gr.update(), gr.update(), gr.update(), last_version
+                thumbnails, full_paths, page_info = get_generated_images(
+                    rescan=False, query=query, page=page, page_size=page_size, max_age_minutes=max_age_minutes
+                )
+                return thumbnails, full_paths, page_info, version
             
             def update_send_button_state(source_info, generated_img):
                 """Update the send button state based on selection state"""
                 try:
-                    print("[Photo Message] Updating send button state...")
-                    print(f"Source info: {source_info}")
-                    print(f"Generated image type: {type(generated_img)}")
+                    logger.debug("Updating send button state...")
                     
                     # Check if we have both a source photo and a generated image
                     has_source = source_info is not None and isinstance(source_info, dict)
@@ -1064,18 +3241,17 @@ def on_ui_tabs():
                     
                     if has_source and has_generated:
                         if source_info.get('is_sent', False):
-                            print("[Photo Message] Source photo already sent")
+                            logger.debug("Source photo already sent")
                             return gr.Button.update(interactive=False, value="Already Sent")
                         else:
-                            print("[Photo Message] Both images selected, enabling button")
+                            logger.debug("Both images selected, enabling button")
                             return gr.Button.update(interactive=True, value="📤 Send to Display App")
                     else:
-                        print("[Photo Message] Missing required selections")
+                        logger.debug("Missing required selections")
                         return gr.Button.update(interactive=False, value="Select both images")
                     
                 except Exception as e:
-                    print(f"[Photo Message] Error updating button state: {e}")
-                    print(traceback.format_exc())
+                    logger.exception("Error updating button state: %s", e)
                     return gr.Button.update(interactive=False, value="Error")
             
             def on_photo_select(evt: gr.SelectData, current_value):
@@ -1087,36 +3263,52 @@ def on_ui_tabs():
                     if row_idx >= len(current_value.index):
                         return None, None
                         
-                    timestamp = current_value.iloc[row_idx, 0]
+                    photo = photos.get(current_value.iloc[row_idx, 0])
+                    if photo is None:
+                        return None, None
                     
-                    # Find the photo in our list
-                    for photo in photos:
-                        if photo.timestamp == timestamp:
-                            # Create info dict with metadata and sent status
-                            photo_info = {
-                                'timestamp': photo.timestamp,
-                                'name': photo.name,
-                                'message': photo.message,
-                                'is_sent': photo.is_sent
-                            }
-                            
-                            # Get the image
-                            try:
-                                image_bytes = base64.b64decode(photo.image_data)
-                                image = Image.open(io.BytesIO(image_bytes))
-                                return image, photo_info
-                            except Exception as e:
-                                print(f"Error decoding image: {e}")
-                                return None, None
-                                
-                    return None, None
+                    # Get the image
+                    try:
+                        return photo.preview, {**photo.info(), 'token': photo_access_token(photo.id)}
+                    except Exception as e:
+                        logger.warning("Error decoding image: %s", e)
+                        return None, None
                 except Exception as e:
-                    print(f"Error in photo selection: {e}")
-                    print(traceback.format_exc())
+                    logger.exception("Error in photo selection: %s", e)
                     return None, None
             
             # Wire up the events
-            refresh_btn.click(fn=update_photo_list, outputs=[photo_list])
+            photo_window = [photo_page, photo_filter_sent, photo_filter_name, photo_filter_within]
+            photo_outputs = [photo_list, photo_page_info, photo_page, photo_list_version]
+            refresh_btn.click(fn=refresh_photo_list, inputs=photo_window, outputs=photo_outputs)
+            # A changed filter starts over at the first page
+            for event in (photo_filter_name.submit, photo_filter_sent.change, photo_filter_within.submit):
+                event(
+                    fn=lambda: 1, outputs=[photo_page]
+                ).then(
+                    fn=refresh_photo_list, inputs=photo_window, outputs=photo_outputs
+                )
+            photo_prev_btn.click(
+                fn=lambda page: max(1, int(page or 1) - 1),
+                inputs=[photo_page],
+                outputs=[photo_page]
+            ).then(
+                fn=refresh_photo_list, inputs=photo_window, outputs=photo_outputs
+            )
+            photo_next_btn.click(
+                fn=lambda page: max(1, int(page or 1) + 1),
+                inputs=[photo_page],
+                outputs=[photo_page]
+            ).then(
+                fn=refresh_photo_list, inputs=photo_window, outputs=photo_outputs
+            )
+            # Show new and newly sent photos while the tab is open
+            photo_message_tab.load(
+                fn=poll_photo_list,
+                inputs=[photo_list_version] + photo_window,
+                outputs=photo_outputs,
+                every=PHOTO_LIST_POLL_SECONDS
+            )
             
             # Update source photo selection
             photo_list.select(
@@ -1132,8 +3324,8 @@ def on_ui_tabs():
             # Update generated image selection
             generated_gallery.select(
                 fn=on_gallery_select,
-                inputs=[generated_gallery],
-                outputs=[selected_generated_image]
+                inputs=[generated_paths],
+                outputs=[selected_generated_image, selected_generated_path]
             ).then(
                 fn=update_send_button_state,
                 inputs=[selected_photo_info, selected_generated_image],
@@ -1141,115 +3333,114 @@ def on_ui_tabs():
             )
             
             # Connect send button to API
+            # Sending only queues the delivery, its progress is polled below
             send_selected_btn.click(
                 fn=send_to_api,
-                inputs=[selected_photo_info, selected_generated_image],
-                outputs=[send_status]
-            ).then(
-                fn=update_photo_list,
-                outputs=[photo_list]
+                inputs=[selected_photo_info, selected_generated_image, selected_generated_path],
+                outputs=[send_status, delivery_job_id]
             ).then(
                 fn=update_send_button_state,
                 inputs=[selected_photo_info, selected_generated_image],
                 outputs=[send_selected_btn]
             )
+            photo_message_tab.load(
+                fn=poll_display_app_status,
+                inputs=[display_app_version],
+                outputs=[display_app_status, display_app_version],
+                every=DISPLAY_APP_POLL_SECONDS
+            )
+            
+            photo_message_tab.load(
+                fn=poll_delivery_status,
+                inputs=[delivery_job_id, delivery_last_status],
+                outputs=[send_status, delivery_last_status],
+                every=DELIVERY_POLL_SECONDS
+            )
+            
+            # ReActor's own img2img components are updated directly, looked up
+            # once here since the img2img tab is built before extension tabs
+            reactor = reactor_components.resolve()
+            # The outputs are fixed now, so the handler must keep returning
+            # this many values even if ReActor is rediscovered later
+            reactor_available = reactor.available
+            reactor_outputs = [status_text]
+            if reactor_available:
+                reactor_outputs += [reactor.enabled, reactor.source]
             
-            # Add click handlers for the buttons with image data
+            def hand_off_to_reactor(photo_info):
+                status, updates = hand_off_to_img2img(photo_info)
+                return (status, *updates) if reactor_available else status
+            
+            # Add click handlers for the buttons with image data. The browser
+            # loads the stored photo into img2img, then a single Python step
+            # points ReActor at the same photo.
             send_to_img2img.click(
-                fn=send_image_to_tab,
-                inputs=[preview_image],
-                outputs=[status_text],
+                fn=hand_off_to_reactor,
+                inputs=[selected_photo_info],
+                outputs=reactor_outputs,
                 _js="""
-                async (img_data) => {
-                    if (!img_data) return "No image selected";
+                async (photo_info) => {
+                    if (!photo_info || !photo_info.id) return photo_info;
                     console.log("[Photo Message] Sending to img2img...");
+                    const started = performance.now();
+                    // Every wait below is capped, so a missing element or a
+                    // stalled fetch can't hold up the hand-off indefinitely
+                    const deadline = started + 5000;
                     
                     // Switch to img2img tab
                     const tabs = gradioApp().querySelector('#tabs');
                     if (tabs) tabs.querySelectorAll('button')[1].click();
                     
-                    await new Promise(r => setTimeout(r, 500));  // Wait for tab switch
-                    
+                    // Reported back to Python so the status shows a failed hand-off
+                    let error = null;
                     try {
-                        // First set the image in img2img
-                        const img2imgImage = gradioApp().querySelector('#img2img_image');
-                        if (!img2imgImage) {
-                            console.error("[Photo Message] Could not find img2img_image element");
-                            return "Could not find img2img input";
-                        }
-
-                        // Create file from image data
-                        let imgData = img_data;
-                        console.log("[Photo Message] Processing image data...");
+                        // Fetch the full-size photo while the tab switches, the
+                        // preview on this page is downscaled
+                        const controller = new AbortController();
+                        const timer = setTimeout(() => controller.abort(), deadline - performance.now());
+                        const photo = fetch(`/sdapi/v1/photo_message/photo/${photo_info.id}?token=${photo_info.token}`, { signal: controller.signal });
                         
-                        // Handle base64 data properly
-                        if (typeof imgData === 'string') {
-                            try {
-                                // If it's a data URL, extract the base64 part
-                                if (imgData.startsWith('data:')) {
-                                    const parts = imgData.split(',');
-                                    if (parts.length === 2) {
-                                        imgData = parts[1];
-                                    }
-                                }
-                                
-                                // Add padding if needed
-                                while (imgData.length % 4 !== 0) {
-                                    imgData += '=';
-                                }
-                                
-                                // Test if we can decode it
-                                atob(imgData);
-                                
-                                // Reconstruct data URL with proper MIME type
-                                imgData = 'data:image/jpeg;base64,' + imgData;
-                                console.log("[Photo Message] Base64 data processed successfully");
-                            } catch (e) {
-                                console.error("[Photo Message] Error processing base64:", e);
-                                return "Error processing image data";
-                            }
+                        // Wait for the img2img upload input to be mounted
+                        let uploadButton = null;
+                        while (!(uploadButton = gradioApp().querySelector('#img2img_image input[type="file"]'))
+                               && performance.now() < deadline) {
+                            await new Promise(r => setTimeout(r, 25));
                         }
                         
-                        // Create file from processed image data
-                        const res = await fetch(imgData);
-                        const blob = await res.blob();
-                        const file = new File([blob], "image.jpg", { type: "image/jpeg" });
-                        
-                        // Set the file in img2img
-                        const uploadButton = img2imgImage.querySelector('input[type="file"]');
-                        if (uploadButton) {
+                        const res = await photo;
+                        clearTimeout(timer);
+                        if (!res.ok) {
+                            error = `could not load the photo (HTTP ${res.status})`;
+                        } else if (!uploadButton) {
+                            error = "could not find the img2img image input";
+                        } else {
+                            const blob = await res.blob();
+                            const file = new File([blob], "image." + blob.type.split('/')[1], { type: blob.type });
                             console.log("[Photo Message] Setting image in img2img...");
                             const dt = new DataTransfer();
                             dt.items.add(file);
                             uploadButton.files = dt.files;
                             uploadButton.dispatchEvent(new Event('change', { bubbles: true }));
                             uploadButton.dispatchEvent(new Event('input', { bubbles: true }));
-                            
-                            // Return success to trigger Python function
-                            return "Image set successfully";
-                        } else {
-                            console.error("[Photo Message] Could not find upload button");
-                            return "Could not find upload button";
                         }
-                    } catch (error) {
-                        console.error("[Photo Message] Error:", error);
-                        return "Error: " + error.message;
+                    } catch (e) {
+                        error = e.name === "AbortError" ? "timed out loading the photo" : String(e);
                     }
+                    if (error) console.error("[Photo Message] Could not send to img2img:", error);
+                    // Pass the selection, the browser's share of the hand-off
+                    // time and any failure on to Python
+                    return { ...photo_info, handoff: { browser_ms: performance.now() - started, error } };
                 }
                 """
-            ).then(
-                fn=setup_reactor_with_image,
-                inputs=[preview_image],
-                outputs=[status_text]
             )
             
             send_to_extras.click(
                 fn=send_image_to_tab,
-                inputs=[preview_image],
+                inputs=[selected_photo_info],
                 outputs=[status_text],
                 _js="""
-                async (img_data) => {
-                    if (!img_data) return "No image selected";
+                async (photo_info) => {
+                    if (!photo_info || !photo_info.id) return photo_info;
                     console.log("[Photo Message] Sending to extras...");
                     
                     // Switch to extras tab
@@ -1262,13 +3453,17 @@ def on_ui_tabs():
                         const extrasInput = gradioApp().querySelector('#extras_image input[type="file"]');
                         if (!extrasInput) {
                             console.error("[Photo Message] Could not find extras input");
-                            return "Could not find extras input";
+                            return photo_info;
                         }
                         
-                        // Create file from image data
-                        const res = await fetch(img_data);
+                        // Fetch the full-size photo, the preview on this page is downscaled
+                        const res = await fetch(`/sdapi/v1/photo_message/photo/${photo_info.id}?token=${photo_info.token}`);
+                        if (!res.ok) {
+                            console.error("[Photo Message] Could not load photo:", res.status);
+                            return photo_info;
+                        }
                         const blob = await res.blob();
-                        const file = new File([blob], "image.png", { type: "image/png" });
+                        const file = new File([blob], "image." + blob.type.split('/')[1], { type: blob.type });
                         
                         // Set the file
                         const dt = new DataTransfer();
@@ -1277,155 +3472,95 @@ def on_ui_tabs():
                         extrasInput.dispatchEvent(new Event('change', { bubbles: true }));
                         
                         console.log("[Photo Message] Image sent successfully");
-                        return "Image sent to extras";
                     } catch (error) {
                         console.error("[Photo Message] Error:", error);
-                        return "Error sending image: " + error.message;
                     }
+                    return photo_info;
                 }
                 """
             )
             
             # Connect refresh button to get_generated_images
+            generated_window = [generated_filter, generated_page, generated_page_size, generated_max_age]
+            generated_outputs = [generated_gallery, generated_paths, generated_page_info, generated_version]
             refresh_generated_btn.click(
-                fn=get_generated_images,
-                outputs=[generated_gallery]
+                fn=refresh_generated_images,
+                inputs=generated_window,
+                outputs=generated_outputs
+            )
+            generated_filter.submit(
+                fn=refresh_generated_images,
+                inputs=generated_window,
+                outputs=generated_outputs
+            )
+            generated_prev_btn.click(
+                fn=lambda page: max(1, int(page or 1) - 1),
+                inputs=[generated_page],
+                outputs=[generated_page]
+            ).then(
+                fn=refresh_generated_images,
+                inputs=generated_window,
+                outputs=generated_outputs
+            )
+            generated_next_btn.click(
+                fn=lambda page: max(1, int(page or 1) + 1),
+                inputs=[generated_page],
+                outputs=[generated_page]
+            ).then(
+                fn=refresh_generated_images,
+                inputs=generated_window,
+                outputs=generated_outputs
             )
             
-        print("[Photo Message] UI tab created successfully")
+            # Pick up new generations from the watcher while the tab is open
+            photo_message_tab.load(
+                fn=poll_generated_images,
+                inputs=[generated_version] + generated_window,
+                outputs=generated_outputs,
+                every=GALLERY_POLL_SECONDS
+            )
+            
+        logger.info("UI tab created successfully")
         return [(photo_message_tab, "Photo Message", "photo_message_a1111")]
     except Exception as e:
-        print(f"[Photo Message] Error creating UI tab: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error creating UI tab: %s", e)
         return []
 
-print("\n[Photo Message] Registering callbacks...")
+logger.debug("Registering callbacks...")
 
 # Register callbacks
 script_callbacks.on_app_started(on_app_started)
 script_callbacks.on_ui_tabs(on_ui_tabs)
+script_callbacks.on_ui_settings(on_ui_settings)
+script_callbacks.on_image_saved(on_image_saved)
+script_callbacks.on_script_unloaded(reactor_components.invalidate)
 
-print("[Photo Message] Extension initialization completed")
+logger.info("Extension initialization completed")
 
-def on_gallery_select(evt: gr.SelectData, gallery):
-    """Handle selection of an image from the generated images gallery"""
+def on_gallery_select(evt: gr.SelectData, gallery_paths):
+    """Load the full-size image behind the selected gallery thumbnail, returning (image, path)"""
     try:
-        print(f"[Photo Message] Gallery selection event: {evt.index}")
-        if gallery is None or not isinstance(gallery, list):
-            print("[Photo Message] Gallery is empty or invalid")
-            return None
-        
-        if evt.index >= len(gallery):
-            print("[Photo Message] Selected index out of range")
-            return None
-            
-        selected = gallery[evt.index]
-        print(f"[Photo Message] Selected image type: {type(selected)}")
-        print(f"[Photo Message] Selected image data: {selected}")  # Debug print
-        
-        # Handle dictionary case from gallery
-        if isinstance(selected, dict):
-            # Try to get the file path from the dictionary
-            if 'name' in selected:
-                # Use the local file path directly
-                file_path = selected['name']
-                print(f"[Photo Message] Using file path: {file_path}")
-                try:
-                    img = Image.open(file_path)
-                    if img.mode != 'RGB':
-                        img = img.convert('RGB')
-                    print("[Photo Message] Successfully loaded image from temp file")
-                    return img
-                except Exception as e:
-                    print(f"[Photo Message] Error opening temp file: {e}")
-                    
-            # If we couldn't get the file directly, try the data URL
-            if 'data' in selected and isinstance(selected['data'], str):
-                if selected['data'].startswith('http'):
-                    try:
-                        response = requests.get(selected['data'], timeout=5)
-                        if response.status_code == 200:
-                            img = Image.open(io.BytesIO(response.content))
-                            if img.mode != 'RGB':
-                                img = img.convert('RGB')
-                            print("[Photo Message] Successfully loaded image from URL")
-                            return img
-                    except Exception as e:
-                        print(f"[Photo Message] Error loading from URL: {e}")
-                        
-            print(f"[Photo Message] Available keys in dict: {list(selected.keys())}")
-            return None
-        
-        # If it's already a PIL Image, return it
-        if isinstance(selected, Image.Image):
-            if selected.mode != 'RGB':
-                selected = selected.convert('RGB')
-            print("[Photo Message] Successfully selected PIL Image from gallery")
-            return selected
-            
-        # Handle path string
-        if isinstance(selected, str):
-            try:
-                img = Image.open(selected)
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                print("[Photo Message] Successfully loaded image from path")
-                return img
-            except Exception as e:
-                print(f"[Photo Message] Error opening image from path: {e}")
-                return None
-                
-        # Handle numpy array
-        if isinstance(selected, np.ndarray):
-            try:
-                img = Image.fromarray(selected)
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                print("[Photo Message] Successfully converted numpy array to image")
-                return img
-            except Exception as e:
-                print(f"[Photo Message] Error converting numpy array: {e}")
-                return None
-                
-        print(f"[Photo Message] Unsupported image type: {type(selected)}")
-        return None
+        logger.debug("Gallery selection event: %s", evt.index)
+        if not gallery_paths or not isinstance(gallery_paths, list):
+            logger.debug("Gallery is empty or invalid")
+            return None, None
         
-    except Exception as e:
-        print(f"[Photo Message] Error in gallery selection: {e}")
-        print(traceback.format_exc())
-        return None
-
-# Improve WebSocket connection handling
-def connect_to_display_app():
-    """Attempt to connect to the display app with better error handling"""
-    try:
-        if hasattr(sio, 'connected') and sio.connected:
-            print("[Photo Message] Already connected to display app")
-            return True
+        if evt.index >= len(gallery_paths):
+            logger.debug("Selected index out of range")
+            return None, None
             
-        print("[Photo Message] Attempting to connect to display app...")
-        
-        # Ensure we're disconnected first
+        file_path = gallery_paths[evt.index]
+        logger.debug("Using file path: %s", file_path)
         try:
-            sio.disconnect()
-        except:
-            pass
-            
-        # Wait a moment before reconnecting
-        time.sleep(1)
-        
-        # Connect with a timeout
-        sio.connect('http://localhost:5001', wait_timeout=5, wait=True)
-        print("[Photo Message] Successfully connected to display app")
-        return True
+            img = Image.open(file_path)
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            logger.debug("Successfully loaded full-size image")
+            return img, file_path
+        except Exception as e:
+            logger.error("Error opening image from path: %s", e)
+            return None, None
         
     except Exception as e:
-        print(f"[Photo Message] Could not connect to display app: {e}")
-        print("[Photo Message] Will retry connection when sending images")
-        return False
-
-# Update the initial connection attempt
-try:
-    connect_to_display_app()
-except Exception as e:
-    print(f"[Photo Message] Initial connection attempt failed: {e}") 
\ No newline at end of file
+        logger.exception("Error in gallery selection: %s", e)
+        return None, None
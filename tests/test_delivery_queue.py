@@ -0,0 +1,148 @@
+"""
+Tests for DeliveryQueue's pending-ack handling.
+
+scripts/__init__.py only imports inside the WebUI (gradio, modules, ...), so
+the delivery classes are compiled on their own from its source together with
+the few standard library names they use.
+"""
+import ast
+import logging
+import os
+import queue
+import threading
+import time
+import unittest
+import uuid
+from collections import OrderedDict
+
+SCRIPT_PATH = os.path.join(os.path.dirname(__file__), "..", "scripts", "__init__.py")
+DELIVERY_CLASSES = ("DeliveryError", "DisplayAppUnavailable", "DeliveryJob", "DeliveryQueue")
+
+
+def load_delivery_classes():
+    with open(SCRIPT_PATH, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), SCRIPT_PATH)
+    module = ast.Module(
+        body=[node for node in tree.body if isinstance(node, ast.ClassDef) and node.name in DELIVERY_CLASSES],
+        type_ignores=[]
+    )
+    namespace = {
+        "logger": logging.getLogger("photo_message"),
+        "queue": queue,
+        "threading": threading,
+        "time": time,
+        "uuid": uuid,
+        "OrderedDict": OrderedDict
+    }
+    exec(compile(module, SCRIPT_PATH, "exec"), namespace)
+    return namespace
+
+
+delivery = load_delivery_classes()
+
+
+class FakePhoto:
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.is_sent = False
+
+
+class FakeRegistry:
+    def __init__(self, *photos):
+        self.photos = {photo.id: photo for photo in photos}
+        self.sent = []
+
+    def get(self, photo_id):
+        return self.photos.get(photo_id)
+
+    def mark_sent(self, photo, is_sent=True):
+        photo.is_sent = is_sent
+        self.sent.append(photo.id)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+class DeliveryQueueTest(unittest.TestCase):
+    ACK_TIMEOUT = 0.2
+
+    def make_queue(self, deliver, **kwargs):
+        self.photo = FakePhoto()
+        self.registry = FakeRegistry(self.photo)
+        kwargs.setdefault("base_delay", 10.0)
+        delivery_queue = delivery["DeliveryQueue"](self.registry, deliver, workers=1,
+                                                   ack_timeout=self.ACK_TIMEOUT, **kwargs)
+        delivery_queue.SWEEP_INTERVAL = 0.02
+        return delivery_queue
+
+    def test_slow_http_send_is_not_timed_out(self):
+        calls = []
+
+        def deliver(photo, generated_image, acknowledge):
+            calls.append(photo.id)
+            time.sleep(self.ACK_TIMEOUT * 4)
+            return "HTTP", True
+
+        delivery_queue = self.make_queue(deliver)
+        job = delivery_queue.submit(self.photo, "generated")
+        self.assertTrue(wait_for(lambda: job.finished))
+
+        self.assertEqual(job.status, "delivered")
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(calls, [self.photo.id])
+        self.assertEqual(self.registry.sent, [self.photo.id])
+        self.assertEqual(delivery_queue.pending_count(), 0)
+
+    def test_connection_lost_does_not_fail_running_http_send(self):
+        started = threading.Event()
+
+        def deliver(photo, generated_image, acknowledge):
+            started.set()
+            time.sleep(self.ACK_TIMEOUT)
+            return "HTTP", True
+
+        delivery_queue = self.make_queue(deliver)
+        job = delivery_queue.submit(self.photo, "generated")
+        self.assertTrue(started.wait(5))
+        delivery_queue.connection_lost()
+        self.assertTrue(wait_for(lambda: job.finished))
+
+        self.assertEqual(job.status, "delivered")
+        self.assertEqual(job.attempts, 1)
+
+    def test_unacknowledged_send_times_out(self):
+        delivery_queue = self.make_queue(lambda photo, generated_image, acknowledge: ("WebSocket", False))
+        job = delivery_queue.submit(self.photo, "generated")
+        self.assertTrue(wait_for(lambda: job.status == "retrying"))
+
+        self.assertIn("No acknowledgement", job.error)
+        self.assertEqual(delivery_queue.pending_count(), 0)
+        self.assertFalse(self.photo.is_sent)
+
+    def test_late_ack_still_delivers(self):
+        acks = []
+
+        def deliver(photo, generated_image, acknowledge):
+            acks.append(acknowledge)
+            return "WebSocket", False
+
+        delivery_queue = self.make_queue(deliver)
+        job = delivery_queue.submit(self.photo, "generated")
+        self.assertTrue(wait_for(lambda: job.status == "retrying"))
+
+        acks[0]({"status": "ok"})
+
+        self.assertEqual(job.status, "delivered")
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(self.registry.sent, [self.photo.id])
+        self.assertEqual(delivery_queue.pending_count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Benchmark for the display app HTTP fallback.
+
+Starts a local stub of the display app's /new_photo endpoint and sends a
+burst of photo-sized JSON payloads, once with a fresh connection per request
+(plain requests.post) and once through a pooled keep-alive session configured
+like the extension's DisplayAppClient, then reports per-request latency.
+
+    python tools/bench_http_client.py --requests 200 --concurrency 4
+"""
+import argparse
+import base64
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+
+class StubDisplayApp(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one segment, otherwise Nagle's algorithm and
+    # delayed ACKs add ~40 ms to every keep-alive response
+    wbufsize = 64 * 1024
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"status": "ok"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def pooled_session(pool_size):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+    session.mount("http://", adapter)
+    return session
+
+
+def run(label, send, count, concurrency):
+    latencies = []
+
+    def task(_):
+        start = time.perf_counter()
+        response = send()
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(task, range(count)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:10s} requests/s={count / elapsed:8.1f}  "
+          f"median={statistics.median(latencies) * 1000:7.2f} ms  p95={p95 * 1000:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests per run")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent senders")
+    parser.add_argument("--payload-kb", type=int, default=256, help="size of each fake image in KB")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubDisplayApp)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/new_photo"
+
+    image = "data:image/jpeg;base64," + base64.b64encode(os.urandom(args.payload_kb * 1024)).decode()
+    payload = {"source_image": image, "generated_image": image, "name": "bench", "message": "bench"}
+
+    run("one-shot", lambda: requests.post(url, json=payload, timeout=10), args.requests, args.concurrency)
+    session = pooled_session(args.concurrency)
+    run("pooled", lambda: session.post(url, json=payload, timeout=10), args.requests, args.concurrency)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
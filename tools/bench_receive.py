@@ -0,0 +1,79 @@
+"""
+Benchmark for the Photo Message receive endpoint.
+
+Uploads the same photo repeatedly at increasing concurrency levels against a
+running WebUI and reports throughput, plus the latency of the ping endpoint
+measured while the uploads are in flight (a blocked event loop shows up as a
+slow ping).
+
+    python tools/bench_receive.py photo.jpg --url http://127.0.0.1:7860
+"""
+import argparse
+import base64
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def upload(session, url, image_b64, index):
+    response = session.post(
+        f"{url}/sdapi/v1/photo_message/receive",
+        json={"image": image_b64, "name": f"bench-{index}", "message": "benchmark"},
+        timeout=60
+    )
+    response.raise_for_status()
+
+
+def ping_while(url, stop, latencies):
+    with requests.Session() as session:
+        while not stop.is_set():
+            start = time.perf_counter()
+            session.get(f"{url}/sdapi/v1/photo_message/ping", timeout=60)
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.05)
+
+
+def run_level(url, image_b64, concurrency, count):
+    local = threading.local()
+
+    def task(index):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        upload(local.session, url, image_b64, index)
+
+    stop = threading.Event()
+    latencies = []
+    pinger = threading.Thread(target=ping_while, args=(url, stop, latencies), daemon=True)
+    pinger.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(task, range(count)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    pinger.join()
+    ping_ms = statistics.median(latencies) * 1000 if latencies else float("nan")
+    print(f"concurrency={concurrency:3d}  uploads/s={count / elapsed:8.2f}  median ping={ping_ms:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("image", help="photo to upload")
+    parser.add_argument("--url", default="http://127.0.0.1:7860", help="WebUI base URL")
+    parser.add_argument("--count", type=int, default=32, help="uploads per concurrency level")
+    parser.add_argument("--levels", default="1,2,4,8", help="comma separated concurrency levels")
+    args = parser.parse_args()
+
+    with open(args.image, "rb") as f:
+        image_b64 = base64.b64encode(f.read()).decode()
+
+    for level in (int(x) for x in args.levels.split(",")):
+        run_level(args.url.rstrip("/"), image_b64, level, args.count)
+
+
+if __name__ == "__main__":
+    main()
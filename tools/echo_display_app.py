@@ -0,0 +1,131 @@
+"""
+Local stand-in for the display app's Socket.IO endpoint.
+
+Serves the same events the display app does ("hello", "new_photo" and
+"new_photo_binary"), acknowledging every photo with the number of image bytes
+it received, so the extension can be pointed at it (port 5001) while testing.
+Repeats of an idempotency key are acknowledged as "duplicate".
+
+    python tools/echo_display_app.py --port 5001
+    python tools/echo_display_app.py --port 5001 --no-binary
+
+With --bench it instead starts on a free port, connects a client to itself
+and sends a burst of photo-sized messages in both formats, keeping up to
+--in-flight messages awaiting their ack, and reports messages/s and the
+image payload size for each.
+
+    python tools/echo_display_app.py --bench --messages 100 --payload-kb 512 --in-flight 8
+"""
+import argparse
+import base64
+import os
+import socket
+import threading
+import time
+
+import socketio
+from aiohttp import web
+
+
+def create_server(binary=True):
+    sio = socketio.AsyncServer(async_mode="aiohttp", max_http_buffer_size=64 * 1024 * 1024)
+    formats = ["binary", "base64"] if binary else ["base64"]
+    stats = {"messages": 0, "bytes": 0}
+    seen = set()
+
+    def receive(data, empty):
+        key = data.get("idempotency_key")
+        if key is not None and key in seen:
+            return {"status": "duplicate", "id": data.get("id")}
+        seen.add(key)
+        size = sum(len(data.get(key) or empty) for key in ("source_image", "generated_image"))
+        stats["messages"] += 1
+        stats["bytes"] += size
+        return {"status": "ok", "id": data.get("id"), "bytes": size}
+
+    @sio.event
+    async def hello(sid, data):
+        print(f"hello from {sid}: {data}")
+        return {"formats": formats, "acks": True}
+
+    @sio.event
+    async def new_photo(sid, data):
+        return receive(data, "")
+
+    @sio.event
+    async def new_photo_binary(sid, data):
+        return receive(data, b"")
+
+    app = web.Application()
+    sio.attach(app)
+    return app, stats
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def bench(messages, payload_kb, in_flight):
+    port = free_port()
+    app, stats = create_server()
+    threading.Thread(target=web.run_app, args=(app,),
+                     kwargs={"host": "127.0.0.1", "port": port, "print": None, "handle_signals": False},
+                     daemon=True).start()
+    time.sleep(1)
+
+    client = socketio.Client()
+    client.connect(f"http://127.0.0.1:{port}", transports=["websocket"])
+    print(f"server formats: {client.call('hello', {'client': 'bench', 'formats': ['binary', 'base64']})['formats']}")
+
+    image = os.urandom(payload_kb * 1024)
+    data_url = "data:image/jpeg;base64," + base64.b64encode(image).decode()
+    variants = {
+        "base64": ("new_photo", {"source_image": data_url, "generated_image": data_url}),
+        "binary": ("new_photo_binary", {"source_image": image, "source_mime_type": "image/jpeg",
+                                        "generated_image": image, "generated_mime_type": "image/jpeg"}),
+    }
+    for label, (event, payload) in variants.items():
+        stats["messages"] = stats["bytes"] = 0
+        slots = threading.BoundedSemaphore(in_flight)
+        done = threading.Semaphore(0)
+
+        def acknowledged(*_):
+            slots.release()
+            done.release()
+
+        start = time.perf_counter()
+        for index in range(messages):
+            slots.acquire()
+            client.emit(event, {**payload, "id": str(index), "idempotency_key": f"{label}-{index}",
+                                "name": "bench", "message": "bench"}, callback=acknowledged)
+        for _ in range(messages):
+            done.acquire()
+        elapsed = time.perf_counter() - start
+        print(f"{label:7s} messages/s={messages / elapsed:8.1f}  "
+              f"payload MB={stats['bytes'] / 1024 / 1024:8.1f}")
+
+    client.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=5001, help="port to serve on")
+    parser.add_argument("--no-binary", action="store_true", help="only announce the base64 format")
+    parser.add_argument("--bench", action="store_true", help="run the throughput benchmark and exit")
+    parser.add_argument("--messages", type=int, default=100, help="messages per format when benchmarking")
+    parser.add_argument("--payload-kb", type=int, default=512, help="size of each fake image in KB")
+    parser.add_argument("--in-flight", type=int, default=8, help="unacknowledged messages allowed when benchmarking")
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.messages, args.payload_kb, args.in_flight)
+        return
+
+    app, _ = create_server(binary=not args.no_binary)
+    web.run_app(app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()